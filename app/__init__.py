@@ -4,6 +4,7 @@ from config import Config
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_restx import Api, fields
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 
 db = SQLAlchemy()
@@ -13,20 +14,43 @@ jwt = JWTManager()
 def create_app(config=Config):
     app = Flask(__name__)
     app.config.from_object(config)
+    if app.config.get('PROXY_FIX_X_FOR'):
+        # remote_addr из X-Forwarded-For: иначе за прокси у всех клиентов один IP
+        hops = app.config['PROXY_FIX_X_FOR']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
     api = Api(app, doc='/docs')
+
+    from .serialization import output_json
+    api.representations['application/json'] = output_json
     
 
     from .routes.auth import user_routes
     from .routes.tasks import task_routes
+    from .routes.summary import report_routes
+    from .routes.stats import stats_routes
+    from .routes.monitoring import monitoring_routes
     api.add_namespace(task_routes)
     api.add_namespace(user_routes)
+    api.add_namespace(report_routes)
+    api.add_namespace(stats_routes)
+    api.add_namespace(monitoring_routes)
     
 
     db.init_app(app)
 
+    from .db_pool import init_db_pool
+    init_db_pool(app)
+
+    from .metrics import init_metrics
+    init_metrics(app)
+
     migrate.init_app(app, db)
     jwt.init_app(app)
 
+    from .user_loader import configure_user_cache
+    configure_user_cache(app)
+    from . import revocation  # noqa: F401 - регистрирует token_in_blocklist_loader
+
 
 
     return app
\ No newline at end of file
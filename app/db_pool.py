@@ -0,0 +1,37 @@
+import logging
+import os
+
+from sqlalchemy import event
+
+from app import db
+
+
+logger = logging.getLogger(__name__)
+
+
+def pool_stats(engine=None):
+    """Состояние пула соединений текущего процесса (воркера gunicorn)"""
+    pool = (engine or db.engine).pool
+    stats = {"pid": os.getpid(), "pool": type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+
+def init_db_pool(app):
+    with app.app_context():
+        engine = db.engine
+
+    timeout = app.config.get('DB_STATEMENT_TIMEOUT_MS')
+    if app.config.get('DB_PGBOUNCER') and timeout and engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+    if app.config.get('DB_POOL_LOG_OVERFLOW'):
+        @event.listens_for(engine, 'checkout')
+        def log_overflow(_dbapi_connection, _record, _proxy):
+            stats = pool_stats(engine)
+            if stats.get('overflow', 0) > 0:
+                logger.warning("DB pool overflow: %s", stats)
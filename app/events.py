@@ -0,0 +1,135 @@
+"""Поток событий о новых задачах для SSE.
+
+Маршрут публикует (student_id, task_id, date_time) до commit; дата нужна
+потоку, чтобы выбирать задачи с ограничением по секциям task. На PostgreSQL это
+pg_notify в той же транзакции: уведомление уходит всем воркерам только после
+commit, каждый воркер слушает канал одним соединением в фоновом потоке.
+На других СУБД (SQLite в тестах) события доставляются внутри процесса
+после commit сессии.
+
+Подписчик держит только очередь, а не соединение с БД и не поток, поэтому
+тысячи простаивающих SSE-клиентов на воркер возможны с
+GUNICORN_WORKER_CLASS=gevent. В gthread/sync каждый клиент занимает поток
+воркера целиком, поэтому там число потоков ограничено
+TASK_STREAM_THREADED_LIMIT на процесс (см. cooperative()).
+"""
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import db
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'task_events'
+# Лимит payload у NOTIFY - 8000 байт
+NOTIFY_CHUNK = 300
+
+
+class TaskBroker:
+    """Подписки процесса: student_id -> множество очередей клиентов"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def subscribe(self, student_id, limit=None):
+        """Очередь событий ученика; None, если подписчиков процесса уже limit"""
+        events = queue.Queue()
+        with self._lock:
+            if limit is not None and self.count() >= limit:
+                return None
+            self._subscribers[student_id].add(events)
+        return events
+
+    def count(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def unsubscribe(self, student_id, events):
+        with self._lock:
+            self._subscribers[student_id].discard(events)
+            if not self._subscribers[student_id]:
+                del self._subscribers[student_id]
+
+    def dispatch(self, tasks):
+        with self._lock:
+            for student_id, task_id, date_time in tasks:
+                for events in self._subscribers.get(student_id, ()):
+                    events.put((task_id, date_time))
+
+    def ensure_listener(self, app):
+        """Запуск LISTEN-потока в текущем процессе (один раз после fork)"""
+        if db.engine.dialect.name != 'postgresql':
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, args=(app,), name='task-events', daemon=True).start()
+
+    def _listen(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    connection = db.engine.raw_connection()
+                connection.detach()
+                dbapi = connection.driver_connection
+                dbapi.autocommit = True
+                dbapi.cursor().execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([dbapi], [], [], 30) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        payload = json.loads(dbapi.notifies.pop(0).payload)
+                        self.dispatch(payload)
+            except Exception:
+                logger.exception("Task events listener failed, reconnecting")
+                time.sleep(1)
+
+
+broker = TaskBroker()
+
+
+def cooperative():
+    """True, если процесс работает под gevent (ожидание не занимает поток ОС)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def publish_tasks(tasks):
+    """Событие «новые задачи» для (student_id, task_id, date_time); вызывать до commit"""
+    tasks = [[int(student_id), int(task_id), date_time.isoformat()] for student_id, task_id, date_time in tasks]
+    if not tasks:
+        return
+    if db.session.get_bind().dialect.name == 'postgresql':
+        for start in range(0, len(tasks), NOTIFY_CHUNK):
+            payload = json.dumps(tasks[start:start + NOTIFY_CHUNK])
+            db.session.execute(func.pg_notify(CHANNEL, payload).select())
+    else:
+        db.session.info.setdefault(CHANNEL, []).extend(tasks)
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_local(session):
+    tasks = session.info.pop(CHANNEL, None)
+    if tasks:
+        broker.dispatch(tasks)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_local(session):
+    session.info.pop(CHANNEL, None)
@@ -0,0 +1,63 @@
+import csv
+import io
+import zlib
+
+from sqlalchemy import select
+
+from app import db
+from app.models import Task, SummaryReport
+from app.serialization import dumps, projection
+
+
+CSV_COLUMNS = ('kind',) + Task.serialize_fields + tuple(
+    field for field in SummaryReport.serialize_fields if field not in Task.serialize_fields
+)
+
+
+def history_rows(student_id, batch_size=1000):
+    """Задачи и отчёты ученика через серверный курсор: в памяти не больше batch_size строк"""
+    sources = (
+        ('task', select(*projection(Task, Task.serialize_fields))
+            .where(Task.student_id == student_id).order_by(Task.date_time, Task.id)),
+        ('report', select(*projection(SummaryReport, SummaryReport.serialize_fields))
+            .where(SummaryReport.user_id == student_id).order_by(SummaryReport.date, SummaryReport.id)),
+    )
+    with db.engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True, yield_per=batch_size)
+        for kind, statement in sources:
+            for row in connection.execute(statement).mappings():
+                yield {"kind": kind, **row}
+
+
+def ndjson_chunks(rows, batch_size=1000):
+    buffer = []
+    for row in rows:
+        buffer.append(dumps(row))
+        if len(buffer) >= batch_size:
+            yield b"\n".join(buffer) + b"\n"
+            buffer = []
+    if buffer:
+        yield b"\n".join(buffer) + b"\n"
+
+
+def csv_chunks(rows, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow({key: value.isoformat() if hasattr(value, 'isoformat') else value
+                         for key, value in row.items()})
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,287 @@
+"""Массовый импорт спортсменов и истории тренировок из CSV / NDJSON.
+
+Каждая запись имеет поле kind:
+
+* user   - phone_number, password, is_trainer, trainer_phone и поля профиля;
+* task   - student_phone, trainer_phone, title, description, type, duration,
+           intensity, date_time;
+* report - phone_number, difficaulty, self_health, comment, is_skip,
+           skip_reason, date.
+
+Записи обрабатываются пачками: телефоны нормализуются разом, пароли
+хешируются на пуле процессов, вставка идёт одним executemany на пачку и
+commit на пачку. Ошибочная строка попадает в отчёт и не прерывает импорт.
+"""
+import csv
+import io
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+
+from sqlalchemy import insert, select, update, bindparam
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.labels import check_labels
+from app.models import User, Task, SummaryReport
+from app.passwords import hash_passwords
+from app.stats import rollup_tasks, rollup_reports
+from app.utils import validate_phones, parse_datetime
+from app.versioning import bump_data_version
+
+
+PROFILE_FIELDS = ('surname', 'name', 'patronymic', 'age', 'weight', 'height', 'gender', 'nickname')
+TASK_FIELDS = ('title', 'description', 'type', 'duration', 'intensity')
+TRUE_VALUES = ('1', 'true', 'yes', 'да')
+
+
+def read_records(stream, fmt):
+    """(номер строки, запись) из текстового потока CSV или NDJSON"""
+    if fmt == 'csv':
+        for line, record in enumerate(csv.DictReader(stream), 2):
+            yield line, {key: value for key, value in record.items() if value not in ('', None)}
+    elif fmt == 'ndjson':
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError:
+                record = None
+            yield line, record if isinstance(record, dict) else {"kind": "invalid"}
+    else:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+
+
+def read_text(data, fmt):
+    return read_records(io.StringIO(data), fmt)
+
+
+def as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+class Importer:
+    """Импорт пачками; trainer_id ограничивает импорт учениками одного тренера"""
+
+    def __init__(self, trainer_id=None, chunk_size=1000, progress=None):
+        self.trainer_id = trainer_id
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = Counter()
+        self.errors = []
+        self.users = {}
+
+    def run(self, records):
+        records = iter(records)
+        processed = 0
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self._process(chunk)
+            processed += len(chunk)
+            if self.progress:
+                self.progress(processed, dict(self.counts), len(self.errors))
+        return {"processed": processed, "created": dict(self.counts), "errors": self.errors}
+
+    def _error(self, line, message):
+        self.errors.append({"line": line, "error": message})
+
+    def _process(self, chunk):
+        by_kind = defaultdict(list)
+        for line, record in chunk:
+            kind = record.get('kind', 'user')
+            if kind not in ('user', 'task', 'report'):
+                self._error(line, "Неизвестный тип записи")
+                continue
+            by_kind[kind].append((line, record))
+
+        self._import_users(by_kind['user'])
+        self._import_tasks(by_kind['task'])
+        self._import_reports(by_kind['report'])
+        db.session.commit()
+
+    def _normalize(self, items, field):
+        """Нормализация телефонов пачкой; строки с неверным номером уходят в ошибки"""
+        results = validate_phones(record.get(field) for _, record in items)
+        valid = []
+        for (line, record), (is_valid, phone) in zip(items, results):
+            if is_valid:
+                valid.append((line, record, phone))
+            else:
+                self._error(line, f"Неверный номер телефона в поле {field}")
+        return valid
+
+    def _resolve(self, phones):
+        """Телефон -> (id, trainer_id) с кэшем между пачками"""
+        missing = {phone for phone in phones if phone not in self.users}
+        if missing:
+            rows = db.session.execute(
+                select(User.phone_number, User.id, User.trainer_id).where(User.phone_number.in_(missing))
+            )
+            for phone, user_id, trainer_id in rows:
+                self.users[phone] = (user_id, trainer_id)
+        return self.users
+
+    def _insert(self, table, items):
+        """executemany пачки в savepoint; при ошибке БД - построчно, чтобы найти виновную строку"""
+        valid = []
+        for line, row in items:
+            error = check_labels(table, row)
+            if error:
+                self._error(line, f"{error['error']}, допустимо: {', '.join(error['allowed'])}")
+            else:
+                valid.append((line, row))
+        items = valid
+        if not items:
+            return []
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table), [row for _, row in items])
+            return [row for _, row in items]
+        except DBAPIError:
+            pass
+        inserted = []
+        for line, row in items:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(table), [row])
+                inserted.append(row)
+            except DBAPIError as error:
+                self._error(line, f"Ошибка БД: {error.orig}")
+        return inserted
+
+    def _import_users(self, items):
+        items = self._normalize(items, 'phone_number')
+        users = self._resolve(phone for _, _, phone in items)
+
+        candidates, seen = [], set()
+        for line, record, phone in items:
+            if phone in users or phone in seen:
+                self._error(line, "Пользователь с таким номером уже существует")
+            elif len(str(record.get('password') or '')) < 6:
+                self._error(line, "Пароль должен содержать минимум 6 символов")
+            else:
+                seen.add(phone)
+                candidates.append((line, record, phone))
+
+        hashes = hash_passwords(str(record['password']) for _, record, _ in candidates)
+        rows = []
+        for (line, record, phone), password_hash in zip(candidates, hashes):
+            row = {field: record.get(field) for field in PROFILE_FIELDS}
+            row.update(phone_number=phone, password_hash=password_hash, is_active=True,
+                       is_trainer=as_bool(record.get('is_trainer')) and self.trainer_id is None)
+            rows.append((line, row))
+        inserted = self._insert(User.__table__, rows)
+        self.counts['user'] += len(inserted)
+
+        # Тренер может быть в этой же пачке, поэтому trainer_id проставляется после вставки
+        links = {}
+        for line, record, phone in candidates:
+            if self.trainer_id is not None:
+                links[phone] = self.trainer_id
+            elif record.get('trainer_phone'):
+                is_valid, trainer_phone = validate_phones([record['trainer_phone']])[0]
+                trainer = is_valid and self._resolve([phone, trainer_phone]).get(trainer_phone)
+                if trainer:
+                    links[phone] = trainer[0]
+                else:
+                    self._error(line, "Тренер не найден")
+        self._resolve(links)
+        params = []
+        for phone, trainer_id in links.items():
+            if phone in self.users:
+                user_id = self.users[phone][0]
+                params.append({"user_id": user_id, "trainer": trainer_id})
+                self.users[phone] = (user_id, trainer_id)
+        if params:
+            db.session.execute(
+                update(User.__table__).where(User.__table__.c.id == bindparam('user_id'))
+                .values(trainer_id=bindparam('trainer')),
+                params,
+            )
+
+    def _owner(self, line, phone):
+        """id пользователя по телефону с проверкой области импорта"""
+        user = self.users.get(phone)
+        if not user:
+            self._error(line, "Пользователь не найден")
+            return None
+        if self.trainer_id is not None and user[1] != self.trainer_id:
+            self._error(line, "Ученик не прикреплён к вам")
+            return None
+        return user[0]
+
+    def _import_tasks(self, items):
+        items = self._normalize(items, 'student_phone')
+        trainer_phones = {}
+        if self.trainer_id is None:
+            for line, record, _ in items:
+                is_valid, phone = validate_phones([record.get('trainer_phone')])[0]
+                trainer_phones[line] = phone if is_valid else None
+        self._resolve([phone for _, _, phone in items] + [p for p in trainer_phones.values() if p])
+
+        rows = []
+        for line, record, phone in items:
+            student_id = self._owner(line, phone)
+            if student_id is None:
+                continue
+            trainer_id = self.trainer_id
+            if trainer_id is None:
+                trainer = self.users.get(trainer_phones[line])
+                if not trainer:
+                    self._error(line, "Тренер не найден")
+                    continue
+                trainer_id = trainer[0]
+            date_time = parse_datetime(record.get('date_time'))
+            if not date_time or not all(record.get(field) for field in TASK_FIELDS):
+                self._error(line, "Не все поля заполнены или неверный формат даты")
+                continue
+            try:
+                duration = int(record['duration'])
+            except (TypeError, ValueError):
+                self._error(line, "Неверное значение duration")
+                continue
+            row = {field: record[field] for field in TASK_FIELDS}
+            row.update(student_id=student_id, trainer_id=trainer_id, date_time=date_time, duration=duration)
+            rows.append((line, row))
+
+        inserted = self._insert(Task.__table__, rows)
+        rollup_tasks(inserted)
+        bump_data_version(*{row['student_id'] for row in inserted}, *{row['trainer_id'] for row in inserted})
+        self.counts['task'] += len(inserted)
+
+    def _import_reports(self, items):
+        items = self._normalize(items, 'phone_number')
+        self._resolve(phone for _, _, phone in items)
+
+        rows = []
+        for line, record, phone in items:
+            user_id = self._owner(line, phone)
+            if user_id is None:
+                continue
+            date = parse_datetime(record.get('date'))
+            if not record.get('difficaulty') or not date:
+                self._error(line, "Не все поля заполнены или неверный формат даты")
+                continue
+            is_skip = as_bool(record.get('is_skip'))
+            if is_skip and not record.get('skip_reason'):
+                self._error(line, "Причина пропуска обязательна, если тренировка пропущена")
+                continue
+            rows.append((line, {
+                "user_id": user_id,
+                "difficaulty": record['difficaulty'],
+                "self_health": record.get('self_health'),
+                "comment": record.get('comment'),
+                "is_skip": is_skip,
+                "skip_reason": record.get('skip_reason'),
+                "date": date,
+            }))
+
+        inserted = self._insert(SummaryReport.__table__, rows)
+        rollup_reports(inserted)
+        bump_data_version(*{row['user_id'] for row in inserted})
+        self.counts['report'] += len(inserted)
@@ -0,0 +1,140 @@
+"""Закрытые словари: тип и интенсивность задачи, пол, оценки в отчёте.
+
+В строках task / user / summary_report хранится smallint-код, метка - один
+раз в таблице label (dimension, code, label). Тип колонки LabelCode
+переводит метку в код при записи и код в метку при чтении по кэшу процесса,
+поэтому модели, выборки и JSON по-прежнему работают с метками.
+
+Словарь закрыт: метки приходят из DEFAULT_LABELS (при create_all) и из
+миграций, новые добавляются командой flask labels add. Неизвестную метку
+маршруты и импорт отклоняют через check_labels до записи.
+"""
+import threading
+
+from sqlalchemy import SmallInteger, func, select
+from sqlalchemy.types import TypeDecorator
+
+from app import db
+
+
+DEFAULT_LABELS = {
+    'task_type': ('run', 'swim', 'bike', 'strength', 'stretching', 'yoga'),
+    'task_intensity': ('low', 'medium', 'high'),
+    'user_gender': ('male', 'female'),
+    'report_difficaulty': ('easy', 'normal', 'hard', 'very hard'),
+    'report_self_health': ('bad', 'ok', 'good'),
+}
+
+
+def default_label_rows():
+    return [
+        {"dimension": dimension, "code": code, "label": label}
+        for dimension, labels in DEFAULT_LABELS.items()
+        for code, label in enumerate(labels, 1)
+    ]
+
+
+class UnknownLabel(ValueError):
+    pass
+
+
+class LabelCache:
+    """(dimension, label) <-> code из таблицы label"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = {}
+        self._labels = {}
+
+    def code(self, dimension, label):
+        return self._codes.get((dimension, label))
+
+    def label(self, dimension, code):
+        return self._labels.get((dimension, code))
+
+    def allowed(self, dimension):
+        return sorted(label for (name, label) in self._codes if name == dimension)
+
+    def reload(self):
+        from app.models import Label
+
+        # Соединение сессии без autoflush: reload вызывается и при подстановке
+        # параметров INSERT / UPDATE во время flush
+        with db.session.no_autoflush:
+            rows = db.session.connection().execute(select(Label.dimension, Label.code, Label.label)).all()
+        with self._lock:
+            self._codes = {(dimension, label): code for dimension, code, label in rows}
+            self._labels = {(dimension, code): label for dimension, code, label in rows}
+
+    def stats(self):
+        return {"size": len(self._codes)}
+
+
+label_cache = LabelCache()
+
+
+class LabelCode(TypeDecorator):
+    """smallint в БД, метка в Python"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, dimension):
+        super().__init__()
+        self.dimension = dimension
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        code = label_cache.code(self.dimension, str(value))
+        if code is None:
+            label_cache.reload()
+            code = label_cache.code(self.dimension, str(value))
+        if code is None:
+            raise UnknownLabel(f"Неизвестная метка {self.dimension}={value!r}, нужна check_labels")
+        return code
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        label = label_cache.label(self.dimension, value)
+        if label is None:
+            # Метку добавили в другом процессе (flask labels add)
+            label_cache.reload()
+            label = label_cache.label(self.dimension, value)
+        return label
+
+
+def add_labels(dimension, labels):
+    """Расширение словаря (flask labels add); возвращает новые метки"""
+    from app.models import Label
+
+    if dimension not in DEFAULT_LABELS:
+        raise ValueError(f"Неизвестный словарь: {dimension}")
+    existing = set(db.session.scalars(select(Label.label).where(Label.dimension == dimension)))
+    added = [label for label in dict.fromkeys(labels) if label not in existing]
+    code = db.session.scalar(select(func.coalesce(func.max(Label.code), 0)).where(Label.dimension == dimension))
+    if code + len(added) > 32767:
+        raise ValueError(f"В словаре {dimension} нет свободных кодов")
+    db.session.add_all(Label(dimension=dimension, code=code, label=label) for code, label in enumerate(added, code + 1))
+    db.session.commit()
+    label_cache.reload()
+    return added
+
+
+def label_columns(table):
+    return [column for column in table.columns if isinstance(column.type, LabelCode)]
+
+
+def check_labels(table, values):
+    """Ошибка для первой недопустимой метки в values (колонка -> метка) или None"""
+    for column in label_columns(table):
+        value = values.get(column.key)
+        if value is None:
+            continue
+        dimension = column.type.dimension
+        if label_cache.code(dimension, str(value)) is None:
+            label_cache.reload()
+            if label_cache.code(dimension, str(value)) is None:
+                return {"error": f"Недопустимое значение {column.key}", "allowed": label_cache.allowed(dimension)}
+    return None
@@ -0,0 +1,230 @@
+"""Метрики запросов: задержка, число и время SQL-запросов, размер ответа.
+
+Данные копятся в памяти процесса и отдаются на /metrics в текстовом
+формате Prometheus. Каждый запрос Prometheus попадает в случайный воркер
+gunicorn, поэтому без METRICS_DIR /metrics показывает только этот воркер
+(метка pid), и ряды не складываются в итог по эндпоинту. С METRICS_DIR
+каждый воркер не реже раза в METRICS_FLUSH_INTERVAL секунд пишет снимок в
+<METRICS_DIR>/<pid>.json, а /metrics суммирует снимки всех воркеров, в том
+числе завершившихся, чтобы счётчики не убывали. Каталог нужно очищать при
+перезапуске сервиса. Показатели пула БД и кэша остаются по процессу.
+Там же журнал медленных запросов и предупреждение о N+1: один и тот же
+SQL больше NPLUS1_THRESHOLD раз за запрос.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import g, has_request_context, request, Response
+from sqlalchemy import event
+
+from app import db
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, counts, total, count):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.total += total
+        self.count += count
+
+    def render(self, name, labels):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class Registry:
+    METRICS = (
+        ('http_request_duration_seconds', 'Request latency', LATENCY_BUCKETS),
+        ('http_request_db_queries', 'SQL statements per request', QUERY_BUCKETS),
+        ('http_request_db_seconds', 'Time spent in SQL per request', LATENCY_BUCKETS),
+        ('http_response_size_bytes', 'Response body size', SIZE_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {name: defaultdict(lambda b=buckets: Histogram(b)) for name, _, buckets in self.METRICS}
+        self.slow_queries = 0
+        self.nplus1_warnings = 0
+
+    def observe(self, labels, values):
+        with self._lock:
+            for name, value in values.items():
+                self._series[name][labels].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "series": {
+                    name: [[*labels, histogram.counts, histogram.total, histogram.count]
+                           for labels, histogram in series.items()]
+                    for name, series in self._series.items()
+                },
+                "slow_queries": self.slow_queries,
+                "nplus1_warnings": self.nplus1_warnings,
+            }
+
+    def dump(self, directory):
+        """Снимок процесса в <directory>/<pid>.json (атомарно через rename)"""
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as target:
+            json.dump(self.snapshot(), target)
+        os.replace(f'{path}.tmp', path)
+
+    @classmethod
+    def merged(cls, directory):
+        """Сумма снимков всех процессов из directory"""
+        total = cls()
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            try:
+                with open(path) as source:
+                    snapshot = json.load(source)
+            except (OSError, ValueError):
+                continue
+            for name, series in snapshot["series"].items():
+                for endpoint, method, status, counts, value_total, count in series:
+                    total._series[name][(endpoint, method, status)].merge(counts, value_total, count)
+            total.slow_queries += snapshot["slow_queries"]
+            total.nplus1_warnings += snapshot["nplus1_warnings"]
+        return total
+
+    def render(self, extra=(), per_process=True):
+        pid = os.getpid()
+        process_label = f'pid="{pid}",' if per_process else ""
+        lines = []
+        with self._lock:
+            for name, help_text, _ in self.METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (endpoint, method, status), histogram in sorted(self._series[name].items()):
+                    labels = f'{process_label}endpoint="{endpoint}",method="{method}",status="{status}"'
+                    lines.extend(histogram.render(name, labels))
+            for name, value in (('db_slow_queries_total', self.slow_queries),
+                                ('db_nplus1_warnings_total', self.nplus1_warnings)):
+                lines.append(f'# TYPE {name} counter')
+                lines.append(f'{name}{{pid="{pid}"}} {value}' if per_process else f'{name} {value}')
+        for name, value in extra:
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{{pid="{pid}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def parameter_shape(parameters):
+    """Типы параметров вместо значений, чтобы не писать в лог персональные данные"""
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def init_metrics(app):
+    with app.app_context():
+        engine = db.engine
+
+    slow_query_ms = app.config.get('SLOW_QUERY_MS', 200)
+    nplus1_threshold = app.config.get('NPLUS1_THRESHOLD', 10)
+    metrics_dir = app.config.get('METRICS_DIR')
+    flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+    next_flush = [0.0]
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if elapsed * 1000 >= slow_query_ms:
+            registry.slow_queries += 1
+            logger.warning("Slow query %.1f ms: %s | params: %s",
+                           elapsed * 1000, statement, parameter_shape(parameters))
+        if has_request_context() and 'db_statements' in g:
+            g.db_statements[statement] += 1
+            g.db_time += elapsed
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_start = time.perf_counter()
+        g.db_statements = Counter()
+        g.db_time = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_start' not in g:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        queries = sum(g.db_statements.values())
+        values = {
+            'http_request_duration_seconds': time.perf_counter() - g.request_start,
+            'http_request_db_queries': queries,
+            'http_request_db_seconds': g.db_time,
+        }
+        # У потоковых ответов длина заранее неизвестна
+        if response.content_length is not None:
+            values['http_response_size_bytes'] = response.content_length
+        registry.observe((endpoint, request.method, response.status_code), values)
+
+        repeated = [(statement, count) for statement, count in g.db_statements.items() if count > nplus1_threshold]
+        for statement, count in repeated:
+            registry.nplus1_warnings += 1
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, endpoint, count, statement)
+
+        if metrics_dir and time.monotonic() >= next_flush[0]:
+            next_flush[0] = time.monotonic() + flush_interval
+            registry.dump(metrics_dir)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        from app.db_pool import pool_stats
+        from app.user_loader import user_cache
+
+        pool = pool_stats(engine)
+        cache = user_cache.stats()
+        extra = [(f'db_pool_{key}', pool[key]) for key in ('size', 'checkedin', 'checkedout', 'overflow') if key in pool]
+        extra += [(f'user_cache_{key}', cache[key]) for key in ('size', 'hits', 'misses')]
+        if metrics_dir:
+            registry.dump(metrics_dir)
+            text = Registry.merged(metrics_dir).render(extra, per_process=False)
+        else:
+            text = registry.render(extra)
+        return Response(text, mimetype='text/plain; version=0.0.4')
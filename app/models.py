@@ -1,7 +1,10 @@
 from app import db, jwt
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
 from sqlalchemy.sql import func
+from sqlalchemy.dialects import postgresql, sqlite
+from app.passwords import hash_password, verify_password, needs_rehash
+from app.labels import LabelCode, default_label_rows
 
 
 class User(db.Model):
@@ -19,15 +22,25 @@ class User(db.Model):
     age = db.Column(db.Integer)
     weight = db.Column(db.Float)
     height = db.Column(db.Float)
-    gender = db.Column(db.String(16))
+    gender = db.Column(LabelCode('user_gender'))
     nickname = db.Column(db.String(255))
+    # Счётчик изменений задач/профиля/отчётов пользователя для ETag
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Версия профиля для оптимистичной блокировки PATCH /users/profile
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
+    __table_args__ = (
+        db.Index('ix_user_trainer_id_nickname', 'trainer_id', 'nickname'),
+    )
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -43,10 +56,26 @@ class User(db.Model):
             "nickname": self.nickname
         }
 
+    PROFILE_FIELDS = ('surname', 'name', 'patronymic', 'age', 'weight', 'height', 'gender', 'nickname')
+
     def add_user(self):
         db.session.add(self)
         db.session.commit()
 
+    @classmethod
+    def insert_if_absent(cls, phone_number, password_hash, is_trainer=False):
+        """INSERT ... ON CONFLICT (phone_number) DO NOTHING RETURNING id; None, если номер занят"""
+        dialect = db.session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        user_id = db.session.scalar(
+            insert(cls)
+            .values(phone_number=phone_number, password_hash=password_hash, is_trainer=is_trainer)
+            .on_conflict_do_nothing(index_elements=[cls.phone_number])
+            .returning(cls.id)
+        )
+        db.session.commit()
+        return user_id
+
     def put_user(self):
         db.session.commit()
         
@@ -61,14 +90,24 @@ class Task(db.Model):
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(128), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    type = db.Column(db.String(128))
+    type = db.Column(LabelCode('task_type'))
     duration = db.Column(db.Integer) 
-    intensity = db.Column(db.String(64))
+    intensity = db.Column(LabelCode('task_intensity'))
     date_time = db.Column(db.DateTime, server_default=func.now())
 
     trainer = db.relationship('User', foreign_keys=[trainer_id], backref='tasks_given')
     student = db.relationship('User', foreign_keys=[student_id], backref='tasks_received')
 
+    # В PostgreSQL таблица секционирована по месяцам date_time, PK (id, date_time) - см. app.partitions
+    __table_args__ = (
+        db.Index('ix_task_student_id_date_time_id', 'student_id', 'date_time', 'id'),
+        db.Index('ix_task_trainer_id_date_time_id', 'trainer_id', 'date_time', 'id'),
+    )
+
+    # Поля to_dict() для выборок через app.serialization.projection
+    serialize_fields = ('id', 'trainer_id', 'student_id', 'title', 'description',
+                        'duration', 'intensity', 'date_time', 'type')
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -89,8 +128,8 @@ class Task(db.Model):
 class SummaryReport(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    difficaulty = db.Column(db.String(128), nullable=False)
-    self_health = db.Column(db.String(128), server_default=func.now())
+    difficaulty = db.Column(LabelCode('report_difficaulty'), nullable=False)
+    self_health = db.Column(LabelCode('report_self_health'))
     comment = db.Column(db.Text)
     is_skip = db.Column(db.Boolean, default=False)
     skip_reason = db.Column(db.String(255))
@@ -98,6 +137,14 @@ class SummaryReport(db.Model):
 
     user = db.relationship('User', backref='summary_reports')
 
+    # В PostgreSQL секционирована по месяцам date (app.partitions)
+    __table_args__ = (
+        db.Index('ix_summary_report_user_id_date', 'user_id', 'date'),
+    )
+
+    serialize_fields = ('id', 'user_id', 'difficaulty', 'self_health', 'comment',
+                        'is_skip', 'skip_reason', 'date')
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -113,3 +160,61 @@ class SummaryReport(db.Model):
     def add_report(self):
         db.session.add(self)
         db.session.commit()
+
+
+class WeeklyStats(db.Model):
+    """Недельные агрегаты по ученику, обновляются при вставке задач и отчётов"""
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    week = db.Column(db.Date, primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+    skip_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        year, week, _ = self.week.isocalendar()
+        return {
+            "student_id": self.student_id,
+            "week": self.week.isoformat(),
+            "iso_year": year,
+            "iso_week": week,
+            "task_count": self.task_count,
+            "total_duration": self.total_duration,
+            "report_count": self.report_count,
+            "skip_count": self.skip_count,
+            "skip_rate": self.skip_count / self.report_count if self.report_count else None
+        }
+
+
+class WeeklyStatsBreakdown(db.Model):
+    """Распределение значений type / intensity / difficaulty за неделю"""
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    week = db.Column(db.Date, primary_key=True)
+    dimension = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.String(128), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Label(db.Model):
+    """Закрытые словари меток; в таблицах хранится code (см. app.labels)"""
+    dimension = db.Column(db.String(32), primary_key=True)
+    code = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    label = db.Column(db.String(128), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'label', name='uq_label_dimension_label'),
+    )
+
+
+@event.listens_for(Label.__table__, 'after_create')
+def seed_labels(table, connection, **kw):
+    # create_all (тесты, benchmarks.datagen); в миграциях словарь заполняет e107659095bf
+    connection.execute(table.insert(), default_label_rows())
+
+
+class RevokedToken(db.Model):
+    """Отозванные JWT; читаются пачками в app.revocation, а не на каждый запрос"""
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, server_default=func.now())
@@ -0,0 +1,143 @@
+"""Помесячные секции task и summary_report (только PostgreSQL).
+
+Миграция fa1bc5747727 секционирует task по RANGE (date_time) и
+summary_report по RANGE (date): секция <таблица>_ГГГГ_ММ на месяц и
+<таблица>_default для строк вне созданных секций.
+
+ensure_partitions создаёт секции на PARTITION_MONTHS_AHEAD месяцев вперёд:
+при старте gunicorn (when_ready) и командой flask partitions ensure, которую
+стоит запускать из cron. archive_partitions отсоединяет секции старше
+заданного месяца, выгружает их в <каталог>/<секция>.csv.gz через COPY и
+удаляет таблицу. В выгрузке коды из таблицы label, а не метки (см.
+app.labels). Недельные агрегаты weekly_stats по архивной истории остаются.
+"""
+import gzip
+import os
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+
+PARTITIONED = (('task', 'date_time'), ('summary_report', 'date'))
+# Ключ pg_advisory_xact_lock, чтобы воркеры не создавали секции одновременно
+LOCK_KEY = 7210525
+# Сколько ждать блокировок DDL: ожидающий ACCESS EXCLUSIVE задерживает все
+# следующие запросы к default-секции. По таймауту транзакция откатывается,
+# секции создаст следующий запуск ensure
+LOCK_TIMEOUT = '5s'
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_{month:%Y_%m}"
+
+
+def is_partitioned(connection, table):
+    return connection.scalar(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table},
+    )
+
+
+def partition_months(connection, table):
+    """Месяцы существующих секций table (по именам <table>_ГГГГ_ММ)"""
+    names = connection.scalars(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:table)"),
+        {"table": table},
+    )
+    pattern = re.compile(rf"^{table}_(\d{{4}})_(\d{{2}})$")
+    return sorted(date(int(match[1]), int(match[2]), 1) for match in map(pattern.match, names) if match)
+
+
+def create_partition(connection, table, column, month):
+    """Секция месяца month; строки этого месяца из default-секции переносятся в неё.
+
+    Таблица создаётся отдельно и присоединяется ATTACH PARTITION: на родителя
+    он берёт SHARE UPDATE EXCLUSIVE, а не ACCESS EXCLUSIVE, как
+    CREATE TABLE ... PARTITION OF. Но default-секцию ATTACH блокирует
+    ACCESS EXCLUSIVE (чтение и запись) до конца транзакции и сканирует её,
+    чтобы в ней не осталось строк нового диапазона. Поэтому секции создаются
+    заранее, пока default-секция почти пуста, а ожидание блокировок
+    ограничено LOCK_TIMEOUT. CHECK с границами месяца избавляет ATTACH от
+    сканирования самой новой таблицы и удаляется после присоединения.
+    """
+    name = partition_name(table, month)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds "
+        f"CHECK ({column} IS NOT NULL AND {column} >= '{bounds['lower']}' AND {column} < '{bounds['upper']}')"
+    ))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE {column} >= :lower AND {column} < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    connection.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+    ))
+    connection.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds"))
+    return name
+
+
+def ensure_partitions(connection, months_ahead=3, today=None):
+    """Секции с текущего месяца на months_ahead вперёд; возвращает имена созданных"""
+    if connection.dialect.name != 'postgresql':
+        return []
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+    connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    current = month_start(today or date.today())
+    created = []
+    for table, column in PARTITIONED:
+        if not is_partitioned(connection, table):
+            continue
+        existing = set(partition_months(connection, table))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(create_partition(connection, table, column, month))
+    connection.commit()
+    return created
+
+
+def archive_partitions(connection, before, directory, keep=False, log=None):
+    """Отсоединение и выгрузка секций, целиком лежащих раньше месяца before.
+
+    Каждая секция обрабатывается в своей транзакции: если выгрузка не
+    удалась, DETACH откатывается и секция остаётся на месте.
+    """
+    if connection.dialect.name != 'postgresql':
+        raise RuntimeError("Секционирование поддерживается только в PostgreSQL")
+    before = month_start(before)
+    os.makedirs(directory, exist_ok=True)
+    archived = []
+    for table, _ in PARTITIONED:
+        if not is_partitioned(connection, table):
+            continue
+        for month in partition_months(connection, table):
+            if add_months(month, 1) > before:
+                break
+            name = partition_name(table, month)
+            path = os.path.join(directory, f"{name}.csv.gz")
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            with gzip.open(f"{path}.part", 'wb') as target:
+                cursor = connection.connection.driver_connection.cursor()
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", target)
+            os.replace(f"{path}.part", path)
+            if not keep:
+                connection.execute(text(f"DROP TABLE {name}"))
+            connection.commit()
+            archived.append(path)
+            if log:
+                log(f"{name} -> {path}")
+    return archived
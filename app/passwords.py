@@ -0,0 +1,73 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def hash_method(config=None):
+    """Строка метода werkzeug по политике хеширования из Config"""
+    config = config or current_app.config
+    algorithm = config.get('PASSWORD_HASH_ALGORITHM', 'scrypt')
+    if algorithm == 'scrypt':
+        return f"scrypt:{config.get('PASSWORD_HASH_MEMORY_COST', 32768)}:8:1"
+    if algorithm.startswith('pbkdf2'):
+        digest = algorithm.partition(':')[2] or 'sha256'
+        return f"pbkdf2:{digest}:{config.get('PASSWORD_HASH_ITERATIONS', 600000)}"
+    raise ValueError(f"Неизвестный алгоритм хеширования: {algorithm}")
+
+
+def _get_pool():
+    """Пул процессов для хеширования; пересоздаётся после fork воркера gunicorn"""
+    global _pool, _pool_pid
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 0)
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(fn, *args):
+    pool = _get_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def hash_passwords(passwords):
+    """Пакетное хеширование для импорта: задачи распределяются по всем процессам пула"""
+    passwords = list(passwords)
+    method = hash_method()
+    pool = _get_pool()
+    if pool is None:
+        return [generate_password_hash(password, method) for password in passwords]
+    return list(pool.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=8))
+
+
+def needs_rehash(password_hash):
+    """True, если хеш создан не по текущей политике"""
+    return password_hash.partition('$')[0] != hash_method()
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False, cancel_futures=True)
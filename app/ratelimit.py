@@ -0,0 +1,155 @@
+"""Ограничение частоты запросов по алгоритму token bucket.
+
+Лимиты задаются в Config строками вида "30/minute" и применяются
+декоратором rate_limit к методам flask_restx Resource до выполнения
+обработчика, то есть до хеширования пароля.
+
+Бэкенд memory хранит бакеты в памяти процесса: у каждого воркера gunicorn
+свой счётчик, и "5/minute" на узле превращается в 5 x GUNICORN_WORKERS (и ещё
+x число узлов). В production нужен общий бэкенд - RATELIMIT_BACKEND=redis.
+
+Ключ по IP берётся из request.remote_addr. За nginx/балансировщиком это адрес
+прокси, пока не задан PROXY_FIX_X_FOR (см. create_app): иначе все клиенты
+делят один бакет.
+"""
+import logging
+import threading
+import time
+import zlib
+from functools import wraps
+
+from flask import current_app, request
+
+from app.utils import validate_phone
+
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit_rule(rule):
+    """Правило "30/minute" -> (30, 60.0)"""
+    count, _, period = rule.partition('/')
+    seconds = PERIODS.get(period)
+    if seconds is None:
+        seconds = float(period)
+    return int(count), float(seconds)
+
+
+class MemoryBackend:
+    """Бакеты в памяти процесса, разбитые на шарды со своими блокировками"""
+
+    def __init__(self, shards=16, max_keys_per_shard=10000):
+        self.max_keys = max_keys_per_shard
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]
+
+    def consume(self, key, capacity, period):
+        """(True, 0) если токен взят, иначе (False, секунд до появления токена)"""
+        rate = capacity / period
+        lock, buckets = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            tokens, updated = buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+            if len(buckets) > self.max_keys:
+                self._prune(buckets, now, period)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    @staticmethod
+    def _prune(buckets, now, period):
+        # Бакет, не трогавшийся дольше периода, уже полон - его можно забыть
+        for key in [key for key, (_, updated) in buckets.items() if now - updated > period]:
+            del buckets[key]
+
+
+class RedisBackend:
+    """Общий для всех воркеров и узлов бакет в Redis (нужен пакет redis)"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, period):
+        rate = capacity / period
+        allowed, tokens = self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate, time.time()])
+        return bool(allowed), 0 if allowed else (1 - float(tokens)) / rate
+
+
+_backends = {}
+
+
+def get_backend():
+    config = current_app.config
+    name = config.get('RATELIMIT_BACKEND', 'memory')
+    backend = _backends.get(name)
+    if backend is None:
+        if name == 'memory':
+            if config.get('GUNICORN_WORKERS', 1) > 1 and not config.get('TESTING'):
+                logger.warning("RATELIMIT_BACKEND=memory is per process: limits are multiplied "
+                               "by the number of workers, use redis")
+            backend = MemoryBackend()
+        elif name == 'redis':
+            backend = RedisBackend(config['RATELIMIT_REDIS_URL'])
+        else:
+            backend = config['RATELIMIT_BACKEND_FACTORY']()
+        _backends[name] = backend
+    return backend
+
+
+def by_ip():
+    return request.remote_addr
+
+
+def by_phone():
+    data = request.get_json(silent=True) or {}
+    phone_number = data.get('phone_number')
+    if not isinstance(phone_number, str) or not phone_number:
+        return None
+    is_valid, normalized = validate_phone(phone_number)
+    return normalized if is_valid else phone_number
+
+
+def rate_limit(setting, key_func):
+    """Декоратор метода Resource: лимит из current_app.config[setting] на ключ key_func()"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            rule = config.get(setting)
+            key = key_func() if config.get('RATELIMIT_ENABLED', True) and rule else None
+            if key is not None:
+                capacity, period = parse_limit_rule(rule)
+                allowed, retry_after = get_backend().consume(f"{setting}:{key}", capacity, period)
+                if not allowed:
+                    return (
+                        {"error": "Слишком много запросов, попробуйте позже"},
+                        429,
+                        {"Retry-After": str(max(1, round(retry_after)))},
+                    )
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
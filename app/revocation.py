@@ -0,0 +1,128 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db, jwt
+from app.models import RevokedToken
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def db_now():
+    """Часы БД в той же форме, что revoked_at (timestamp без зоны, server_default now()).
+
+    В PostgreSQL now() в такой колонке превращается в LOCALTIMESTAMP сессии,
+    а select now() вернул бы время с зоной, несравнимое с revoked_at.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return db.session.scalar(select(func.localtimestamp()))
+    return db.session.scalar(select(func.now()))
+
+
+class BloomFilter:
+    """Битовый массив с k хешами (двойное хеширование blake2b)"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """Отозванные JTI процесса: bloom-фильтр для быстрого «нет» и точное множество.
+
+    Таблица revoked_token читается инкрементально не чаще раза в
+    REVOCATION_SYNC_INTERVAL секунд; полная перестройка с отбрасыванием
+    истёкших токенов - раз в REVOCATION_REBUILD_INTERVAL. Отзыв в своём
+    процессе применяется сразу, в остальных воркерах - после синхронизации.
+
+    Инкремент берётся по revoked_at с нахлёстом REVOCATION_SYNC_OVERLAP
+    секунд, а не по id: id выдаётся при вставке, а видна строка после
+    commit, и транзакции коммитятся не в порядке id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(0)
+        self._next_sync = 0
+        self._next_rebuild = 0
+
+    def _reset(self, capacity):
+        self.bloom = BloomFilter(max(capacity * 2, 1024))
+        self.revoked = {}
+        self.watermark = None
+
+    def _add(self, jti, expires_at):
+        self.bloom.add(jti)
+        self.revoked[jti] = expires_at
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        config = current_app.config
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+            if force or now >= self._next_rebuild or self.watermark is None:
+                rows = db.session.execute(query.where(RevokedToken.expires_at > utcnow())).all()
+                self._reset(len(rows))
+                self._next_rebuild = now + config.get('REVOCATION_REBUILD_INTERVAL', 3600)
+            else:
+                overlap = timedelta(seconds=config.get('REVOCATION_SYNC_OVERLAP', 60))
+                rows = db.session.execute(query.where(RevokedToken.revoked_at >= self.watermark - overlap)).all()
+            for row in rows:
+                self._add(row.jti, row.expires_at)
+            latest = max((row.revoked_at for row in rows if row.revoked_at), default=None)
+            if latest and (self.watermark is None or latest > self.watermark):
+                self.watermark = latest
+            elif self.watermark is None:
+                self.watermark = db_now()
+            self._next_sync = now + config.get('REVOCATION_SYNC_INTERVAL', 10)
+
+    def is_revoked(self, jti):
+        self.sync()
+        if jti not in self.bloom:
+            return False
+        return jti in self.revoked
+
+    def revoke(self, jti, expires_at):
+        """Запись в revoked_token и немедленное применение в текущем процессе"""
+        if not db.session.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)):
+            db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            db.session.commit()
+        with self._lock:
+            self._add(jti, expires_at)
+
+
+revocations = RevocationList()
+
+
+@jwt.token_in_blocklist_loader
+def token_in_blocklist(_jwt_header, jwt_payload):
+    # sid общий у access- и refresh-токенов одного входа, см. app.routes.auth
+    if jwt_payload.get('sid') and revocations.is_revoked(jwt_payload['sid']):
+        return True
+    return revocations.is_revoked(jwt_payload['jti'])
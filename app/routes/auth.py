@@ -1,18 +1,44 @@
-from flask import request, jsonify
+import uuid
+from itertools import islice
+from datetime import datetime, timezone
+from flask import request, jsonify, current_app
 from flask_restx import Namespace, Resource
 from flask_jwt_extended import (
     create_access_token, 
     create_refresh_token,
     jwt_required,
     get_jwt_identity,
+    get_jwt,
+    current_user,
 )
-from ..models import User
-from ..utils import validate_phone
+from sqlalchemy import case, func, select, update
+from .. import db
+from ..models import User, Task, SummaryReport
+from ..utils import validate_phone, parse_limit
+from ..serialization import projection, select_dicts
+from ..user_loader import invalidate_user
+from ..versioning import conditional
+from ..revocation import revocations
+from ..ratelimit import rate_limit, by_ip, by_phone
+from ..importer import Importer, read_text
+from ..passwords import hash_password
+from ..labels import check_labels
 
 user_routes = Namespace('users')
 
+
+def issue_tokens(user_id):
+    """access- и refresh-токены одного входа с общим sid, чтобы logout отзывал оба"""
+    claims = {"sid": uuid.uuid4().hex}
+    return (
+        create_access_token(identity=str(user_id), additional_claims=claims),
+        create_refresh_token(identity=str(user_id), additional_claims=claims),
+    )
+
+
 @user_routes.route("/register")
 class UserReg(Resource):
+    @rate_limit('RATELIMIT_REGISTER_PER_IP', by_ip)
     def post(self):
         data = request.get_json()
         if not data:
@@ -32,15 +58,14 @@ class UserReg(Resource):
         if len(password) < 6:
             return {"error": "Пароль должен содержать минимум 6 символов"}, 400
 
-        if User.query.filter_by(phone_number=normalized_phone).first():
+        # Хеш считается до обращения к БД, чтобы соединение не простаивало
+        password_hash = hash_password(password)
+        user_id = User.insert_if_absent(normalized_phone, password_hash, bool(is_trainer))
+        if user_id is None:
             return {"error": "Пользователь с таким номером уже существует"}, 409
 
-        user = User(phone_number=normalized_phone, is_trainer=is_trainer)
-        user.set_password(password)
-        user.add_user()
-
-        access_token = create_access_token(identity=phone_number)
-        refresh_token = create_refresh_token(identity=phone_number)
+        user = User(phone_number=normalized_phone, is_trainer=bool(is_trainer))
+        access_token, refresh_token = issue_tokens(user_id)
 
         return {
             "message": "Пользователь успешно зарегистрирован",
@@ -53,6 +78,8 @@ class UserReg(Resource):
 
 @user_routes.route('/login')
 class UserLogin(Resource):
+    @rate_limit('RATELIMIT_LOGIN_PER_IP', by_ip)
+    @rate_limit('RATELIMIT_LOGIN_PER_PHONE', by_phone)
     def post(self):
         try:
             data = request.get_json()
@@ -78,8 +105,11 @@ class UserLogin(Resource):
             if not user.is_active:
                 return {"error": "Аккаунт деактивирован"}, 403
 
-            access_token = create_access_token(identity=str(user.id))
-            refresh_token = create_refresh_token(identity=str(user.id))
+            if user.password_needs_rehash():
+                user.set_password(password)
+                user.put_user()
+
+            access_token, refresh_token = issue_tokens(user.id)
 
             return {
                 "message": "Авторизация успешна",
@@ -92,16 +122,73 @@ class UserLogin(Resource):
             return {"error": "Ошибка при авторизации"}, 500
 
 
+@user_routes.route('/refresh')
+class UserRefresh(Resource):
+    @jwt_required(refresh=True)
+    def post(self):
+        claims = {"sid": get_jwt()['sid']} if get_jwt().get('sid') else None
+        access_token = create_access_token(identity=get_jwt_identity(), additional_claims=claims)
+        return {"access_token": access_token}, 200
+
+
+@user_routes.route('/logout')
+class UserLogout(Resource):
+    @jwt_required(verify_type=False)
+    def post(self):
+        """Отзыв предъявленного токена и всего входа (sid): и access, и refresh"""
+        token = get_jwt()
+        expires_at = datetime.fromtimestamp(token['exp'], timezone.utc).replace(tzinfo=None)
+        revocations.revoke(token['jti'], expires_at)
+        if token.get('sid'):
+            # Живёт не дольше refresh-токена этого входа
+            session_expires = datetime.now(timezone.utc).replace(tzinfo=None) + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+            revocations.revoke(token['sid'], session_expires)
+        return {"message": "Токен отозван"}, 200
+
+
+@user_routes.route('/import')
+class UserImport(Resource):
+    @jwt_required()
+    def post(self):
+        """Импорт учеников тренера и их истории: тело text/csv или application/x-ndjson"""
+        if not current_user.is_trainer:
+            return {"error": "Доступ запрещен: вы не являетесь тренером"}, 403
+
+        # Импорт идёт в запросе и должен уложиться в GUNICORN_TIMEOUT: большие
+        # файлы - через flask import-athletes. Хеширование паролей дороже всего,
+        # поэтому записи user ограничены отдельно
+        config = current_app.config
+        too_large = {"error": "Слишком большой импорт, используйте flask import-athletes"}, 413
+        if (request.content_length or 0) > config['IMPORT_MAX_BYTES']:
+            return too_large
+        fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        data = request.get_data(as_text=True)
+        if not data:
+            return {"error": "Данные не предоставлены"}, 400
+        if len(data) > config['IMPORT_MAX_BYTES']:
+            return too_large
+
+        records = list(islice(read_text(data, fmt), config['IMPORT_MAX_ROWS'] + 1))
+        users = sum(1 for _, record in records if record.get('kind', 'user') == 'user')
+        if len(records) > config['IMPORT_MAX_ROWS'] or users > config['IMPORT_MAX_USERS']:
+            return too_large
+
+        result = Importer(trainer_id=current_user.id).run(records)
+        invalidate_user(current_user.id)
+        return result, 200
+
+
 @user_routes.route('/profile')
 class UserUpdate(Resource):
     @jwt_required()
     def put(self):
-        user = User.query.filter_by(id=int(get_jwt_identity())).first()
-        if not user:
-            return {"error": "Пользователь не найден"}, 404 
+        user = current_user
         data = request.get_json()
         if not data:
             return {"error": "Данные не предоставлены"}, 400 
+        error = check_labels(User.__table__, data)
+        if error:
+            return error, 400
         user.surname = data.get('surname', user.surname) 
         user.name = data.get('name', user.name)
         user.patronymic = data.get('patronymic', user.patronymic)
@@ -110,44 +197,121 @@ class UserUpdate(Resource):
         user.height = data.get('height', user.height)
         user.gender = data.get('gender', user.gender)
         user.nickname = data.get('nickname', user.nickname)
+        user.data_version = User.data_version + 1
+        user.version = User.version + 1
         user.put_user()
-        return {"message": "Профиль успешно обновлен", "user": user.to_dict()}, 200
+        invalidate_user(user.id)
+        return {"message": "Профиль успешно обновлен", "user": user.to_dict(), "version": user.version}, 200
+
+    @jwt_required()
+    def patch(self):
+        """Частичное обновление: один UPDATE ... WHERE id AND version RETURNING"""
+        data = request.get_json()
+        if not data:
+            return {"error": "Данные не предоставлены"}, 400
+        version = data.get('version')
+        if not isinstance(version, int) or isinstance(version, bool):
+            return {"error": "Требуется текущая версия профиля (version)"}, 400
+        values = {field: data[field] for field in User.PROFILE_FIELDS if field in data}
+        if not values:
+            return {"error": "Нет полей для обновления"}, 400
+
+        error = check_labels(User.__table__, values)
+        if error:
+            return error, 400
+
+        user_id = int(get_jwt_identity())
+        row = db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.version == version)
+            .values(**values, version=User.version + 1, data_version=User.data_version + 1)
+            .returning(User.version, User.phone_number, User.is_trainer,
+                       *(getattr(User, field) for field in User.PROFILE_FIELDS))
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.session.commit()
+        if row is None:
+            current = db.session.scalar(select(User.version).where(User.id == user_id))
+            return {"error": "Профиль был изменён, обновите данные", "version": current}, 409
+
+        invalidate_user(user_id)
+        profile = row._asdict()
+        return {"message": "Профиль успешно обновлен", "version": profile.pop('version'), "user": profile}, 200
 
     @jwt_required()
+    @conditional
     def get(self):
-        user = User.query.filter_by(id=int(get_jwt_identity())).first()
-        if not user:
-            return {"error": "Пользователь не найден"}, 404 
-        return {"user": user.to_dict()}, 200
+        # ETag не совпал - профиль менялся, снимок из кэша может быть устаревшим
+        db.session.refresh(current_user)
+        return {"user": current_user.to_dict(), "version": current_user.version}, 200
+
+
+ROSTER_FIELDS = ('id', 'surname', 'name', 'patronymic', 'nickname', 'age', 'gender', 'weight', 'height')
+ROSTER_SORT_FIELDS = ('id', 'surname', 'last_task_date', 'open_tasks', 'last_report_date')
+
+
+def roster_query(trainer_id, with_aggregates):
+    """Ученики тренера; с with_aggregates агрегаты по задачам и отчётам
+    присоединяются сгруппированными подзапросами в том же SELECT"""
+    query = select(*projection(User, ROSTER_FIELDS)).where(User.trainer_id == trainer_id, User.is_trainer.isnot(True))
+    if not with_aggregates:
+        return query
+
+    tasks = (
+        select(
+            Task.student_id,
+            func.max(Task.date_time).label('last_task_date'),
+            func.sum(case((Task.date_time >= func.now(), 1), else_=0)).label('open_tasks'),
+        )
+        .where(Task.trainer_id == trainer_id)
+        .group_by(Task.student_id)
+        .subquery()
+    )
+    reports = (
+        select(SummaryReport.user_id, func.max(SummaryReport.date).label('last_report_date'))
+        .join(User, User.id == SummaryReport.user_id)
+        .where(User.trainer_id == trainer_id)
+        .group_by(SummaryReport.user_id)
+        .subquery()
+    )
+    return (
+        query.add_columns(
+            tasks.c.last_task_date,
+            func.coalesce(tasks.c.open_tasks, 0).label('open_tasks'),
+            reports.c.last_report_date,
+        )
+        .outerjoin(tasks, tasks.c.student_id == User.id)
+        .outerjoin(reports, reports.c.user_id == User.id)
+    )
 
 
 @user_routes.route('/profile/students')
 class TrainerStudents(Resource):
     @jwt_required()
     def get(self):
-        user_id = int(get_jwt_identity())
-        trainer = User.query.filter_by(id=user_id).first()
-
-        if not trainer:
-            return {"error": "Пользователь не найден"}, 404
+        trainer = current_user
         if not trainer.is_trainer:
             return {"error": "Доступ запрещен: вы не являетесь тренером"}, 403
 
-        students = User.query.filter_by(trainer_id=trainer.id, is_trainer=False).all()
+        with_aggregates = request.args.get('aggregates', '').lower() in ('1', 'true', 'yes')
+        sort = request.args.get('sort', 'id')
+        order = request.args.get('order', 'asc')
+        if sort not in ROSTER_SORT_FIELDS or order not in ('asc', 'desc'):
+            return {"error": "Неверные параметры сортировки"}, 400
+        if sort not in ('id', 'surname') and not with_aggregates:
+            return {"error": "Сортировка по агрегатам требует aggregates=1"}, 400
 
-        return {
-            "students": [
-                {
-                    "id": student.id,
-                    "surname": student.surname,
-                    "name": student.name,
-                    "patronymic": student.patronymic,
-                    "nickname": student.nickname,
-                    "age": student.age,
-                    "gender": student.gender,
-                    "weight": student.weight,
-                    "height": student.height,
-                }
-                for student in students
-            ]
-        }, 200
\ No newline at end of file
+        query = roster_query(trainer.id, with_aggregates)
+        column = getattr(User, sort) if sort in ('id', 'surname') else query.selected_columns[sort]
+        column = column.desc() if order == 'desc' else column.asc()
+        query = query.order_by(column.nulls_last(), User.id)
+
+        if request.args.get('limit'):
+            limit = parse_limit(request.args.get('limit'))
+            offset = request.args.get('offset', 0, type=int)
+            if limit is None or offset < 0:
+                return {"error": "Неверные параметры пагинации"}, 400
+            query = query.limit(limit).offset(offset)
+
+        # Строки сразу в словари, без ORM-объектов; даты сериализует output_json
+        return {"students": select_dicts(query)}, 200
@@ -0,0 +1,17 @@
+from flask_restx import Namespace, Resource
+from app.db_pool import pool_stats
+from app.user_loader import user_cache
+
+monitoring_routes = Namespace('monitoring', description='Service health and runtime statistics')
+
+
+@monitoring_routes.route('/pool')
+class PoolStats(Resource):
+    def get(self):
+        return pool_stats(), 200
+
+
+@monitoring_routes.route('/user-cache')
+class UserCacheStats(Resource):
+    def get(self):
+        return user_cache.stats(), 200
@@ -0,0 +1,45 @@
+from flask import request
+from flask_jwt_extended import jwt_required, current_user
+from flask_restx import Namespace, Resource
+from sqlalchemy import select
+from app import db
+from app.models import User, WeeklyStats, WeeklyStatsBreakdown
+from app.stats import week_start
+from app.utils import parse_datetime
+
+stats_routes = Namespace('stats', description='Weekly athlete statistics')
+
+
+@stats_routes.route('/students/<int:student_id>')
+class StudentStats(Resource):
+    @jwt_required()
+    def get(self, student_id):
+        if student_id != current_user.id:
+            if not current_user.is_trainer:
+                return {"error": "Доступ запрещен: вы не являетесь тренером"}, 403
+            student = db.session.get(User, student_id)
+            if not student or student.trainer_id != current_user.id:
+                return {"error": "Ученик не найден или не прикреплён к вам"}, 404
+
+        date_from = parse_datetime(request.args.get('date_from'))
+        date_to = parse_datetime(request.args.get('date_to'))
+        if (request.args.get('date_from') and not date_from) or (request.args.get('date_to') and not date_to):
+            return {"error": "Неверный формат даты"}, 400
+
+        weeks = select(WeeklyStats).where(WeeklyStats.student_id == student_id)
+        breakdown = select(WeeklyStatsBreakdown).where(WeeklyStatsBreakdown.student_id == student_id)
+        if date_from:
+            weeks = weeks.where(WeeklyStats.week >= week_start(date_from))
+            breakdown = breakdown.where(WeeklyStatsBreakdown.week >= week_start(date_from))
+        if date_to:
+            weeks = weeks.where(WeeklyStats.week <= week_start(date_to))
+            breakdown = breakdown.where(WeeklyStatsBreakdown.week <= week_start(date_to))
+
+        result = {}
+        for row in db.session.scalars(weeks.order_by(WeeklyStats.week)):
+            result[row.week] = dict(row.to_dict(), type={}, intensity={}, difficaulty={})
+        for row in db.session.scalars(breakdown):
+            if row.week in result:
+                result[row.week][row.dimension][row.value] = row.count
+
+        return {"weeks": list(result.values())}, 200
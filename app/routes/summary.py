@@ -1,40 +1,104 @@
 from flask import request
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, current_user
 from flask_restx import Namespace, Resource
+from sqlalchemy import select, tuple_
+from app import db
+from app.labels import check_labels
+from app.models import User, SummaryReport
+from app.serialization import projection, select_dicts
+from app.stats import rollup_reports
+from app.versioning import bump_data_version
+from app.utils import parse_datetime, parse_limit, encode_cursor, decode_cursor
 
 report_routes = Namespace('summary', description='Summary related operations')
 
+
 @report_routes.route('/report')
-class SummaryReport(Resource):
+class Reports(Resource):
     @jwt_required()
     def post(self):
         data = request.get_json()
-        user_id = data.get('user_id')
+        if not data:
+            return {"error": "Данные не предоставлены"}, 400
+
         difficaulty = data.get('difficaulty')
         self_health = data.get('self_health')
         comment = data.get('comment')
         is_skip = data.get('is_skip')
         skip_reason = data.get('skip_reason')
-        date = data.get('date')
+        date = parse_datetime(data.get('date'))
+
+        if not difficaulty:
+            return {"error": "Не все поля заполнены"}, 400
+
+        if data.get('date') and not date:
+            return {"error": "Неверный формат даты"}, 400
 
         if is_skip and not skip_reason:
             return {"error": "Причина пропуска обязательна, если тренировка пропущена"}, 400
-        
+
+        error = check_labels(SummaryReport.__table__, data)
+        if error:
+            return error, 400
+
         new_report = SummaryReport(
             difficaulty=difficaulty,
             self_health=self_health,
             comment=comment,
             is_skip=is_skip,
             skip_reason=skip_reason,
-            user_id=user_id, 
+            user_id=current_user.id, 
             date=date
         )
-        new_report.add_report()
+        db.session.add(new_report)
+        rollup_reports([new_report])
+        bump_data_version(current_user.id)
+        db.session.commit()
 
         return new_report.to_dict(), 201
     
 
     @jwt_required()
     def get(self):
-        reports = SummaryReport.query.all()
-        return [report.to_dict() for report in reports], 200
\ No newline at end of file
+        user_id = current_user.id
+        if request.args.get('student_id'):
+            if not current_user.is_trainer:
+                return {"error": "Доступ запрещен: вы не являетесь тренером"}, 403
+            student = db.session.get(User, request.args.get('student_id', type=int))
+            if not student or student.trainer_id != current_user.id:
+                return {"error": "Ученик не найден или не прикреплён к вам"}, 404
+            user_id = student.id
+
+        limit = parse_limit(request.args.get('limit'))
+        if limit is None:
+            return {"error": "Неверное значение limit"}, 400
+
+        query = select(*projection(SummaryReport, SummaryReport.serialize_fields)).where(SummaryReport.user_id == user_id)
+
+        if request.args.get('after'):
+            after = decode_cursor(request.args['after'])
+            if after == (None, None):
+                return {"error": "Неверный курсор"}, 400
+            query = query.where(tuple_(SummaryReport.date, SummaryReport.id) > tuple_(*after))
+
+        date_from = parse_datetime(request.args.get('date_from'))
+        date_to = parse_datetime(request.args.get('date_to'))
+        if (request.args.get('date_from') and not date_from) or (request.args.get('date_to') and not date_to):
+            return {"error": "Неверный формат даты"}, 400
+        if date_from:
+            query = query.where(SummaryReport.date >= date_from)
+        if date_to:
+            query = query.where(SummaryReport.date < date_to)
+
+        reports = select_dicts(
+            query.order_by(SummaryReport.date, SummaryReport.id).limit(limit)
+        )
+
+        next_cursor = None
+        if len(reports) == limit:
+            next_cursor = encode_cursor(reports[-1]['date'], reports[-1]['id'])
+
+        return {
+            "reports": reports,
+            "next_cursor": next_cursor
+        }, 200
@@ -1,29 +1,151 @@
-from flask import request, jsonify
+import queue
+import time
+from datetime import datetime, timedelta
+from flask import request, jsonify, current_app, Response, stream_with_context
 from flask_restx import Namespace, Resource
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user, get_jwt
+from sqlalchemy import insert, select, tuple_, union, update
 from app import db
 from app.models import User, Task
+from app.events import broker, cooperative, publish_tasks
+from app.labels import check_labels
+from app.revocation import token_in_blocklist
+from app.export import history_rows, ndjson_chunks, csv_chunks, gzip_chunks
+from app.serialization import dumps, projection, select_dicts
+from app.stats import rollup_tasks
+from app.user_loader import invalidate_user
+from app.versioning import bump_data_version, conditional
+from app.utils import parse_datetime, parse_limit, encode_cursor, decode_cursor
 
 
 task_routes = Namespace('tasks')
 
+
+def task_feed(user_id, limit, after=None, date_from=None, date_to=None, before=None, newest=False):
+    """Задачи пользователя (как ученика и как тренера) по возрастанию (date_time, id).
+
+    newest=True - по убыванию, со следующей страницей по курсору before.
+    Каждая ветка UNION идёт по своему составному индексу и сама ограничена
+    limit, поэтому стоимость страницы не зависит от длины истории.
+    Возвращает словари полей Task.to_dict() без загрузки ORM-объектов.
+    """
+    order = (Task.date_time.desc(), Task.id.desc()) if newest else (Task.date_time, Task.id)
+    branches = []
+    for column in (Task.student_id, Task.trainer_id):
+        branch = select(*projection(Task, Task.serialize_fields)).where(column == user_id)
+        if after is not None:
+            # Сравнение кортежей не отсекает секции, отдельное условие по дате - отсекает
+            branch = branch.where(tuple_(Task.date_time, Task.id) > tuple_(*after), Task.date_time >= after[0])
+        if before is not None:
+            branch = branch.where(tuple_(Task.date_time, Task.id) < tuple_(*before), Task.date_time <= before[0])
+        if date_from is not None:
+            branch = branch.where(Task.date_time >= date_from)
+        if date_to is not None:
+            branch = branch.where(Task.date_time < date_to)
+        branch = branch.order_by(*order).limit(limit)
+        branches.append(select(branch.subquery()))
+
+    feed = union(*branches).subquery()
+    if newest:
+        order = (feed.c.date_time.desc(), feed.c.id.desc())
+    else:
+        order = (feed.c.date_time, feed.c.id)
+    return select_dicts(select(*projection(feed, Task.serialize_fields)).order_by(*order).limit(limit))
+
+
+def feed_window(before):
+    """Нижняя граница страницы «сначала новые»: TASK_FEED_WINDOW_DAYS до курсора или до сейчас"""
+    days = current_app.config['TASK_FEED_WINDOW_DAYS']
+    if not days:
+        return None
+    return (before[0] if before else datetime.now()) - timedelta(days=days)
+
+
+def previous_cursor(tasks, limit, window_from, conditions):
+    """Курсор before на более старые задачи или None, если их нет.
+
+    Неполная страница значит, что окно кончилось: курсор ставится на самую
+    новую задачу раньше окна (по одной на условие - ветку UNION), так что
+    пустые окна между тренировками не приходится листать.
+    """
+    if len(tasks) == limit:
+        return encode_cursor(tasks[-1]['date_time'], tasks[-1]['id'])
+    if window_from is None:
+        return None
+    older = [
+        db.session.execute(
+            select(Task.date_time, Task.id)
+            .where(condition, Task.date_time < window_from)
+            .order_by(Task.date_time.desc(), Task.id.desc())
+            .limit(1)
+        ).first()
+        for condition in conditions
+    ]
+    older = [row for row in older if row]
+    if not older:
+        return None
+    date_time, task_id = max(older)
+    # before исключает саму позицию курсора, поэтому id + 1
+    return encode_cursor(date_time, task_id + 1)
+
+
+def assignable_students(student_ids):
+    """id -> trainer_id для учеников из student_ids; тренеры не попадают"""
+    return dict(db.session.execute(
+        select(User.id, User.trainer_id)
+        .where(User.id.in_(student_ids), User.is_trainer.isnot(True))
+    ).all())
+
+
+def student_error(students, student_id, trainer_id):
+    # Тренеры и чужие ученики не подходят: trainer_id даёт доступ к отчётам,
+    # статистике и выгрузке истории, переназначать его молча нельзя
+    if student_id not in students:
+        return "Ученик не найден"
+    if students[student_id] not in (None, trainer_id):
+        return "Ученик прикреплён к другому тренеру"
+    return None
+
+
 @task_routes.route('/task')
 class CreateTask(Resource):
     @jwt_required()
     def post(self):
         data = request.get_json()
-        trainer_id = int(get_jwt_identity())
+        if not data:
+            return {"error": "Данные не предоставлены"}, 400
+        if not current_user.is_trainer:
+            return {"error": "Доступ запрещен: вы не являетесь тренером"}, 403
+        trainer_id = current_user.id
         student_id = data.get('student_id')
         title = data.get('title')
         type = data.get('type')
         duration = data.get('duration')
         intensity = data.get('intensity')
         description = data.get('description')
-        date_time = data.get('date_time')
+        date_time = parse_datetime(data.get('date_time'))
 
-        if not all([student_id, title, description, date_time, type, duration, intensity]):
+        if not all([student_id, title, description, data.get('date_time'), type, duration, intensity]):
             return {"error": "Не все поля заполнены"}, 400
 
+        if not date_time:
+            return {"error": "Неверный формат даты"}, 400
+
+        try:
+            student_id = int(student_id)
+            duration = int(duration)
+        except (TypeError, ValueError):
+            return {"error": "Неверный student_id или duration"}, 400
+
+        error = check_labels(Task.__table__, data)
+        if error:
+            return error, 400
+
+        students = assignable_students([student_id])
+        error = student_error(students, student_id, trainer_id)
+        if error:
+            return {"error": error}, 404 if student_id not in students else 403
+
         new_task = Task(
             trainer_id=trainer_id,
             student_id=student_id,
@@ -34,51 +156,322 @@ class CreateTask(Resource):
             duration=duration,
             intensity=intensity
         )
-        new_task.add_task()
+        db.session.add(new_task)
+        rollup_tasks([new_task])
+        db.session.flush()
+        publish_tasks([(new_task.student_id, new_task.id, new_task.date_time)])
 
-        user = User.query.filter_by(id=student_id).first()
-        if user:
-            user.trainer_id = trainer_id
+        if students[student_id] is None:
+            db.session.execute(
+                update(User)
+                .where(User.id == student_id, User.trainer_id.is_(None))
+                .values(trainer_id=trainer_id)
+            )
+        bump_data_version(trainer_id, student_id)
 
         db.session.commit()
+        invalidate_user(student_id)
 
         return new_task.to_dict(), 201
 
     @jwt_required()
+    @conditional
     def get(self):
-        user_id = int(get_jwt_identity())
-        tasks = Task.query.filter(
-            (Task.student_id == user_id) | (Task.trainer_id == user_id)
-        ).all()
+        user_id = current_user.id
+
+        limit = parse_limit(request.args.get('limit'))
+        if limit is None:
+            return {"error": "Неверное значение limit"}, 400
 
-        return [
-            task.to_dict() for task in tasks
-        ], 200
+        after = before = None
+        if request.args.get('after'):
+            after = decode_cursor(request.args['after'])
+            if after == (None, None):
+                return {"error": "Неверный курсор"}, 400
+        if request.args.get('before'):
+            before = decode_cursor(request.args['before'])
+            if before == (None, None):
+                return {"error": "Неверный курсор"}, 400
+
+        date_from = parse_datetime(request.args.get('date_from'))
+        date_to = parse_datetime(request.args.get('date_to'))
+        if (request.args.get('date_from') and not date_from) or (request.args.get('date_to') and not date_to):
+            return {"error": "Неверный формат даты"}, 400
+
+        next_cursor = prev_cursor = None
+        if after is None and date_from is None:
+            # Без начала периода - сначала новые, окнами по TASK_FEED_WINDOW_DAYS:
+            # страница читает только секции своего окна
+            window_from = feed_window(before)
+            tasks = task_feed(user_id, limit, date_from=window_from, date_to=date_to, before=before, newest=True)
+            prev_cursor = previous_cursor(
+                tasks, limit, window_from,
+                [column == user_id for column in (Task.student_id, Task.trainer_id)],
+            )
+        else:
+            tasks = task_feed(user_id, limit, after, date_from, date_to)
+            if len(tasks) == limit:
+                next_cursor = encode_cursor(tasks[-1]['date_time'], tasks[-1]['id'])
+
+        return {
+            "tasks": tasks,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }, 200
     
 
+@task_routes.route('/stream')
+class TaskStream(Resource):
+    @jwt_required()
+    def get(self):
+        """Server-Sent Events: новые задачи ученика по мере их создания"""
+        student_id = current_user.id
+        config = current_app.config
+        heartbeat = config.get('TASK_STREAM_HEARTBEAT', 15)
+        token = get_jwt()
+        broker.ensure_listener(current_app._get_current_object())
+        # В gthread/sync простаивающий клиент держит поток воркера целиком
+        limit = None if cooperative() else config.get('TASK_STREAM_THREADED_LIMIT', 1)
+        events = broker.subscribe(student_id, limit)
+        if events is None:
+            return {"error": "Слишком много открытых потоков событий, попробуйте позже"}, 503, {"Retry-After": "30"}
+        # Соединение с БД не держим, пока клиент просто ждёт
+        db.session.close()
+
+        def stream():
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    # Поток живёт не дольше токена и закрывается после logout
+                    remaining = token['exp'] - time.time()
+                    revoked = remaining > 0 and token_in_blocklist(None, token)
+                    # sync() списка отзыва мог открыть транзакцию - не держим её до следующего события
+                    db.session.close()
+                    if remaining <= 0 or revoked:
+                        yield "event: expired\ndata: {}\n\n"
+                        return
+                    try:
+                        received = [events.get(timeout=min(heartbeat, remaining))]
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    while not events.empty():
+                        received.append(events.get_nowait())
+                    task_ids = [task_id for task_id, _ in received]
+                    dates = [parse_datetime(date_time) for _, date_time in received]
+                    # Диапазон дат ограничивает поиск по id нужными секциями task
+                    tasks = select_dicts(
+                        select(*projection(Task, Task.serialize_fields))
+                        .where(Task.id.in_(task_ids), Task.date_time.between(min(dates), max(dates)))
+                        .order_by(Task.id)
+                    )
+                    db.session.close()
+                    for task in tasks:
+                        yield f"id: {task['id']}\nevent: task\ndata: {dumps(task).decode()}\n\n"
+            finally:
+                broker.unsubscribe(student_id, events)
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+
+@task_routes.route('/export/<int:student_id>')
+class HistoryExport(Resource):
+    @jwt_required()
+    def get(self, student_id):
+        """Потоковая выгрузка задач и отчётов ученика в NDJSON или CSV"""
+        if student_id != current_user.id:
+            student = db.session.get(User, student_id)
+            if not current_user.is_trainer or not student or student.trainer_id != current_user.id:
+                return {"error": "Ученик не найден или не прикреплён к вам"}, 404
+
+        export_format = request.args.get('format', 'ndjson')
+        if export_format == 'ndjson':
+            chunks, mimetype = ndjson_chunks(history_rows(student_id)), 'application/x-ndjson'
+        elif export_format == 'csv':
+            chunks, mimetype = csv_chunks(history_rows(student_id)), 'text/csv'
+        else:
+            return {"error": "Поддерживаются форматы ndjson и csv"}, 400
+        db.session.close()
+
+        headers = {
+            'Content-Disposition': f'attachment; filename=history-{student_id}.{export_format}',
+            'Vary': 'Accept-Encoding',
+        }
+        if 'gzip' in request.accept_encodings:
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
+TASK_FIELDS = ('student_id', 'title', 'description', 'date_time', 'type', 'duration', 'intensity')
+BULK_MAX_TASKS = 1000
+
+
+def expand_bulk_payload(data):
+    """Список задач из тела запроса: либо явный tasks, либо template × student_ids × dates"""
+    if 'tasks' in data:
+        return data['tasks'] if isinstance(data['tasks'], list) else None
+
+    template = data.get('template')
+    student_ids = data.get('student_ids')
+    dates = data.get('dates')
+    if not isinstance(template, dict) or not isinstance(student_ids, list) or not isinstance(dates, list):
+        return None
+
+    return [
+        dict(template, student_id=student_id, date_time=date_time)
+        for student_id in student_ids
+        for date_time in dates
+    ]
+
+
+@task_routes.route('/tasks:bulk')
+class BulkTasks(Resource):
+    @jwt_required()
+    def post(self):
+        data = request.get_json()
+        if not data:
+            return {"error": "Данные не предоставлены"}, 400
+        if not current_user.is_trainer:
+            return {"error": "Доступ запрещен: вы не являетесь тренером"}, 403
+        trainer_id = current_user.id
+
+        items = expand_bulk_payload(data)
+        if not items:
+            return {"error": "Список задач пуст или имеет неверный формат"}, 400
+        if len(items) > BULK_MAX_TASKS:
+            return {"error": f"Не более {BULK_MAX_TASKS} задач за один запрос"}, 400
+
+        rows, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not all(item.get(field) for field in TASK_FIELDS):
+                errors.append({"index": index, "error": "Не все поля заполнены"})
+                continue
+            date_time = parse_datetime(item['date_time'])
+            if not date_time:
+                errors.append({"index": index, "error": "Неверный формат даты"})
+                continue
+            try:
+                student_id = int(item['student_id'])
+                duration = int(item['duration'])
+            except (TypeError, ValueError):
+                errors.append({"index": index, "error": "Неверный student_id или duration"})
+                continue
+            error = check_labels(Task.__table__, item)
+            if error:
+                errors.append({"index": index, **error})
+                continue
+            rows.append((index, {
+                "trainer_id": trainer_id,
+                "student_id": student_id,
+                "title": item['title'],
+                "description": item['description'],
+                "date_time": date_time,
+                "type": item['type'],
+                "duration": duration,
+                "intensity": item['intensity'],
+            }))
+
+        student_ids = {row['student_id'] for _, row in rows}
+        students = assignable_students(student_ids)
+        for index, row in rows:
+            error = student_error(students, row['student_id'], trainer_id)
+            if error:
+                errors.append({"index": index, "error": error})
+
+        if errors:
+            return {"error": "Ошибка валидации", "errors": sorted(errors, key=lambda e: e['index'])}, 400
+
+        rows = [row for _, row in rows]
+        task_ids = db.session.scalars(
+            insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+        ).all()
+        rollup_tasks(rows)
+        publish_tasks((row['student_id'], task_id, row['date_time']) for row, task_id in zip(rows, task_ids))
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(student_ids), User.trainer_id.is_(None))
+            .values(trainer_id=trainer_id)
+        )
+        bump_data_version(trainer_id, *student_ids)
+        db.session.commit()
+        for student_id in student_ids:
+            invalidate_user(student_id)
+
+        return {"created": len(task_ids), "ids": task_ids}, 201
+
+
 @task_routes.route('/profile/students/<string:nickname>')
 class StudentTasks(Resource):
     @jwt_required()
     def get(self, nickname):
-        trainer_id = int(get_jwt_identity())
+        trainer_id = current_user.id
+
+        limit = parse_limit(request.args.get('limit'))
+        if limit is None:
+            return {"error": "Неверное значение limit"}, 400
+
+        after = before = window_from = None
+        for name in ('after', 'before'):
+            if request.args.get(name):
+                cursor = decode_cursor(request.args[name])
+                if cursor == (None, None):
+                    return {"error": "Неверный курсор"}, 400
+                after, before = (cursor, before) if name == 'after' else (after, cursor)
+        date_from = parse_datetime(request.args.get('date_from'))
+        if request.args.get('date_from') and not date_from:
+            return {"error": "Неверный формат даты"}, 400
+
+        task_filter = [Task.student_id == User.id, Task.trainer_id == trainer_id]
+        newest = after is None and date_from is None
+        if newest:
+            # Как в ленте /tasks/task: сначала новые, окнами по TASK_FEED_WINDOW_DAYS
+            window_from = feed_window(before)
+            if window_from is not None:
+                task_filter.append(Task.date_time >= window_from)
+            if before is not None:
+                task_filter += [tuple_(Task.date_time, Task.id) < tuple_(*before), Task.date_time <= before[0]]
+            order = (Task.date_time.desc(), Task.id.desc())
+        else:
+            if after is not None:
+                task_filter += [tuple_(Task.date_time, Task.id) > tuple_(*after), Task.date_time >= after[0]]
+            if date_from is not None:
+                task_filter.append(Task.date_time >= date_from)
+            order = (Task.date_time, Task.id)
+
+        # Ученик ищется по (trainer_id, nickname), задачи присоединяются внешним
+        # join'ом: один запрос отличает «нет ученика» от «нет задач»
+        rows = select_dicts(
+            select(User.id.label('student_ref'), *projection(Task, Task.serialize_fields))
+            .outerjoin(Task, db.and_(*task_filter))
+            .where(User.trainer_id == trainer_id, User.nickname == nickname, User.is_trainer.isnot(True))
+            .order_by(*order)
+            .limit(limit)
+        )
 
-        trainer = User.query.filter_by(id=trainer_id, is_trainer=True).first()
-        if not trainer:
-            return {"error": "Доступ запрещен: вы не тренер"}, 403
-        student = User.query.filter_by(nickname=nickname, trainer_id=trainer.id, is_trainer=False).first()
-        if not student:
+        if not rows:
             return {"error": "Ученик не найден или не прикреплён к вам"}, 404
 
-        tasks = Task.query.filter_by(student_id=student.id, trainer_id=trainer.id).all()
+        student_id = rows[0]['student_ref']
+        for row in rows:
+            del row['student_ref']
+        tasks = [row for row in rows if row['id'] is not None]
+        next_cursor = prev_cursor = None
+        if newest:
+            prev_cursor = previous_cursor(
+                tasks, limit, window_from,
+                [db.and_(Task.student_id == student_id, Task.trainer_id == trainer_id)],
+            )
+        elif len(tasks) == limit:
+            next_cursor = encode_cursor(tasks[-1]['date_time'], tasks[-1]['id'])
 
         return {
-            "tasks": [
-                {
-                    "id": task.id,
-                    "title": task.title,
-                    "description": task.description,
-                    "due_date": task.due_date.isoformat() if task.due_date else None
-                }
-                for task in tasks
-            ]
+            "tasks": tasks,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
         }, 200
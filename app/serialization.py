@@ -0,0 +1,56 @@
+import json
+from datetime import date, datetime
+
+from flask import make_response, current_app
+
+from app import db
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    """JSON в bytes: orjson, если установлен, иначе stdlib json"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default).encode()
+
+
+def output_json(data, code, headers=None):
+    """Представление application/json для flask_restx Api.
+
+    Даты и datetime сериализуются сами, поэтому списки из select_dicts
+    можно отдавать без вызова isoformat() на каждую строку.
+    """
+    settings = current_app.config.get("RESTX_JSON")
+    if settings or current_app.debug:
+        settings = dict(settings or {})
+        settings.setdefault("indent", 4)
+        dumped = json.dumps(data, default=_default, **settings).encode()
+    else:
+        dumped = dumps(data)
+
+    resp = make_response(dumped + b"\n", code)
+    resp.headers.extend(headers or {})
+    return resp
+
+
+def projection(source, fields):
+    """Колонки fields модели или подзапроса для select() без загрузки ORM-объектов"""
+    columns = source.c if hasattr(source, 'c') else source.__table__.c
+    return [columns[name] for name in fields]
+
+
+def select_dicts(statement):
+    """Выполнение select() и чтение строк кортежами сразу в словари"""
+    result = db.session.execute(statement)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
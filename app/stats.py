@@ -0,0 +1,136 @@
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import User, Task, SummaryReport, WeeklyStats, WeeklyStatsBreakdown
+
+
+def week_start(moment):
+    """Понедельник ISO-недели, в которую попадает moment (None - текущая неделя, как server_default)"""
+    moment = moment or datetime.now()
+    day = moment.date() if isinstance(moment, datetime) else moment
+    return day - timedelta(days=day.weekday())
+
+
+def _upsert(model, rows, keys, counters):
+    """INSERT ... ON CONFLICT DO UPDATE с прибавлением счётчиков"""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    stmt = insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in counters},
+    )
+    db.session.execute(stmt, rows)
+
+
+def _flush(totals, breakdown):
+    _upsert(
+        WeeklyStats,
+        [dict(zip(('student_id', 'week'), key), **values) for key, values in totals.items()],
+        ['student_id', 'week'],
+        ['task_count', 'total_duration', 'report_count', 'skip_count'],
+    )
+    _upsert(
+        WeeklyStatsBreakdown,
+        [
+            {"student_id": student_id, "week": week, "dimension": dimension, "value": value, "count": count}
+            for (student_id, week, dimension, value), count in breakdown.items()
+        ],
+        ['student_id', 'week', 'dimension', 'value'],
+        ['count'],
+    )
+
+
+def _getter(row):
+    if isinstance(row, Mapping):
+        return row.get
+    return lambda name: getattr(row, name)
+
+
+def _empty_totals():
+    return {"task_count": 0, "total_duration": 0, "report_count": 0, "skip_count": 0}
+
+
+def rollup_tasks(tasks):
+    """Учёт новых задач в недельных агрегатах; tasks - объекты Task или словари колонок.
+
+    Вызывается в той же транзакции, что и вставка, до commit.
+    """
+    totals = defaultdict(_empty_totals)
+    breakdown = Counter()
+    for task in tasks:
+        get = _getter(task)
+        key = (get('student_id'), week_start(get('date_time')))
+        totals[key]["task_count"] += 1
+        totals[key]["total_duration"] += int(get('duration') or 0)
+        for dimension in ('type', 'intensity'):
+            if get(dimension):
+                breakdown[key + (dimension, get(dimension))] += 1
+    _flush(totals, breakdown)
+
+
+def rollup_reports(reports):
+    """Учёт новых отчётов в недельных агрегатах; аналогично rollup_tasks"""
+    totals = defaultdict(_empty_totals)
+    breakdown = Counter()
+    for report in reports:
+        get = _getter(report)
+        key = (get('user_id'), week_start(get('date')))
+        totals[key]["report_count"] += 1
+        totals[key]["skip_count"] += 1 if get('is_skip') else 0
+        if get('difficaulty'):
+            breakdown[key + ('difficaulty', get('difficaulty'))] += 1
+    _flush(totals, breakdown)
+
+
+def _rebuild_range(low, high, batch_size):
+    """Пересчёт агрегатов учеников с id из [low, high) одной транзакцией"""
+    # FOR UPDATE на строках user конфликтует с FOR KEY SHARE, который берёт
+    # проверка внешнего ключа при вставке задачи или отчёта: начатые вставки
+    # учеников диапазона дожидаются здесь и попадают в пересчёт, новые ждут
+    # commit и прибавляются к пересчитанным агрегатам
+    db.session.execute(select(User.id).where(User.id >= low, User.id < high).with_for_update())
+    for model in (WeeklyStatsBreakdown, WeeklyStats):
+        db.session.execute(delete(model).where(model.student_id >= low, model.student_id < high))
+
+    processed = Counter()
+    for model, column, rollup in ((Task, Task.student_id, rollup_tasks),
+                                  (SummaryReport, SummaryReport.user_id, rollup_reports)):
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(model.__table__)
+                .where(column >= low, column < high, model.id > last_id)
+                .order_by(model.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            rollup(rows)
+            last_id = rows[-1]['id']
+            processed[model.__tablename__] += len(rows)
+    db.session.commit()
+    return processed
+
+
+def rebuild_rollups(batch_size=5000, students=200, log=print):
+    """Полный пересчёт агрегатов по истории диапазонами по students учеников.
+
+    Каждый диапазон - своя транзакция: читатели видят по ученику либо
+    прежние, либо пересчитанные агрегаты, но не пустые, а вставки задач и
+    отчётов ждут только пересчёта своего диапазона (см. _rebuild_range).
+    Строки читаются пачками по batch_size.
+    """
+    last = db.session.scalar(select(func.max(User.id))) or 0
+    db.session.commit()
+    total = Counter()
+    for low in range(1, last + 1, students):
+        total.update(_rebuild_range(low, low + students, batch_size))
+        log(f"ученики до {min(low + students - 1, last)} из {last}: "
+            + ", ".join(f"{name} {count}" for name, count in sorted(total.items())))
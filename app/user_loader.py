@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db, jwt
+from app.models import User
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с ограничением времени жизни записей"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_cache = TTLCache()
+
+_USER_COLUMNS = [column.key for column in User.__mapper__.column_attrs]
+
+
+def configure_user_cache(app):
+    user_cache.maxsize = app.config.get('USER_CACHE_SIZE', user_cache.maxsize)
+    user_cache.ttl = app.config.get('USER_CACHE_TTL', user_cache.ttl)
+
+
+def invalidate_user(user_id):
+    user_cache.pop(user_id)
+
+
+def _attach(values):
+    """Привязка снимка из кэша к текущей сессии без запроса в БД"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+@jwt.user_lookup_loader
+def load_user(_jwt_header, jwt_data):
+    try:
+        user_id = int(jwt_data[current_app.config['JWT_IDENTITY_CLAIM']])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    values = user_cache.get(user_id)
+    if values is not None:
+        return _attach(values)
+
+    user = db.session.get(User, user_id)
+    if not user or not user.is_active:
+        return None
+    user_cache.set(user_id, {key: getattr(user, key) for key in _USER_COLUMNS})
+    return user
+
+
+@jwt.user_lookup_error_loader
+def user_lookup_error(_jwt_header, _jwt_data):
+    return jsonify({"error": "Пользователь не найден"}), 404
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_change(_mapper, _connection, target):
+    invalidate_user(target.id)
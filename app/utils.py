@@ -1,13 +1,28 @@
+import base64
+import binascii
 import phonenumbers
 import re
+from functools import lru_cache
+from datetime import datetime
 
-def validate_phone(phone_number):
-    """Валидация и нормализация номера телефона (начинается с 7, без +)"""
-    if not phone_number:
-        return False, None
 
+CANONICAL_PHONE = re.compile(r'^7\d{10}$')
+NON_DIGITS = re.compile(r'\D')
+
+
+@lru_cache(maxsize=65536)
+def _is_valid_digits(digits):
+    """Проверка через phonenumbers; результат кэшируется, т.к. разбор метаданных дорогой"""
+    try:
+        return phonenumbers.is_valid_number(phonenumbers.parse("+" + digits, "RU"))
+    except phonenumbers.NumberParseException:
+        return False
+
+
+def normalize_phone(phone_number):
+    """Приведение к виду 7XXXXXXXXXX без проверки по phonenumbers"""
     # Удаляем все нецифровые символы
-    digits = re.sub(r'\D', '', phone_number)
+    digits = NON_DIGITS.sub('', phone_number)
 
     # Преобразуем "8" в "7" (стандарт для России)
     if digits.startswith("8"):
@@ -17,12 +32,59 @@ def validate_phone(phone_number):
     if len(digits) == 10:
         digits = "7" + digits
 
-    # Проверка через phonenumbers
-    try:
-        parsed = phonenumbers.parse("+" + digits, "RU")
-        if phonenumbers.is_valid_number(parsed):
-            return True, digits  # без плюса, просто строка вида "7XXXXXXXXXX"
-        else:
-            return False, None
-    except:
+    return digits
+
+
+def validate_phone(phone_number):
+    """Валидация и нормализация номера телефона (начинается с 7, без +)"""
+    if not phone_number or not isinstance(phone_number, str):
         return False, None
+
+    # Быстрый путь: номер уже в каноническом виде
+    digits = phone_number if CANONICAL_PHONE.match(phone_number) else normalize_phone(phone_number)
+
+    if _is_valid_digits(digits):
+        return True, digits  # без плюса, просто строка вида "7XXXXXXXXXX"
+    return False, None
+
+
+def validate_phones(phone_numbers):
+    """Пакетная валидация для импорта: список пар (is_valid, normalized) в исходном порядке"""
+    return [validate_phone(phone_number) for phone_number in phone_numbers]
+
+
+def parse_datetime(value):
+    """Разбор даты/времени в формате ISO 8601, None при ошибке"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_limit(value, default=50, maximum=200):
+    """Размер страницы из query-параметра, ограниченный сверху"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        return None
+    if limit < 1:
+        return None
+    return min(limit, maximum)
+
+
+def encode_cursor(moment, row_id):
+    """Курсор для keyset-пагинации по паре (дата, id)"""
+    raw = f"{moment.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Обратное к encode_cursor, (None, None) при некорректном курсоре"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(moment), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+        return None, None
@@ -0,0 +1,47 @@
+import hashlib
+from functools import wraps
+
+from flask import request, Response
+from flask_jwt_extended import current_user
+from sqlalchemy import select, update
+
+from app import db
+from app.models import User
+
+
+def bump_data_version(*user_ids):
+    """Увеличение data_version в текущей транзакции; commit делает вызывающий код"""
+    ids = {user_id for user_id in user_ids if user_id is not None}
+    if ids:
+        db.session.execute(
+            update(User).where(User.id.in_(ids)).values(data_version=User.data_version + 1)
+        )
+
+
+def etag_for(user_id):
+    """ETag текущего запроса по data_version пользователя: один запрос по первичному ключу"""
+    version = db.session.scalar(select(User.data_version).where(User.id == user_id))
+    raw = f"{user_id}:{version}:{request.method}:{request.full_path}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(fn):
+    """Ответ 304 по If-None-Match без выполнения обработчика.
+
+    Ставится под @jwt_required(). Обработчик вызывается только при
+    несовпадении ETag, к успешному ответу добавляется заголовок ETag.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        etag = etag_for(current_user.id)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+        result = fn(*args, **kwargs)
+        if not isinstance(result, tuple):
+            result = (result, 200)
+        data, code, headers = (result + ({},))[:3]
+        if code == 200:
+            headers = dict(headers, ETag=f'"{etag}"')
+        return data, code, headers
+    return wrapper
@@ -0,0 +1,5 @@
+"""Бенчмарки: генератор синтетических данных и замеры эндпоинтов.
+
+    python -m benchmarks.datagen --trainers 10 --students 1000 --tasks-per-student 200
+    python -m benchmarks.harness --mode client gunicorn --output bench.json
+"""
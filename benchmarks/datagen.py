@@ -0,0 +1,145 @@
+"""Детерминированный генератор данных зала: тренеры, ученики, задачи, отчёты.
+
+Все пользователи получают пароль PASSWORD; телефоны тренеров -
+79000000000 + i, учеников - 79010000000 + i (i с 1), поэтому harness
+может войти под любым из них. Вставка идёт пачками через executemany
+с commit на пачку, так что масштаб ограничен диском, а не памятью.
+Даты - последние --days дней до начала текущих суток: при том же seed
+данные совпадают с точностью до сдвига на день запуска.
+
+    python -m benchmarks.datagen --trainers 1000 --students 100000 --tasks-per-student 200
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import create_app, db
+from app.labels import DEFAULT_LABELS, check_labels
+from app.models import User, Task, SummaryReport
+from app.passwords import hash_password
+from app.stats import rebuild_rollups
+
+
+PASSWORD = 'benchmark'
+TRAINER_PHONE_BASE = 79000000000
+STUDENT_PHONE_BASE = 79010000000
+# Только метки закрытого словаря (app.labels), иначе LabelCode не найдёт код
+TYPES = DEFAULT_LABELS['task_type']
+INTENSITIES = DEFAULT_LABELS['task_intensity']
+GENDERS = DEFAULT_LABELS['user_gender']
+DIFFICULTIES = DEFAULT_LABELS['report_difficaulty']
+
+
+def trainer_phone(index):
+    return str(TRAINER_PHONE_BASE + index)
+
+
+def student_phone(index):
+    return str(STUDENT_PHONE_BASE + index)
+
+
+def ids_by_phone(first, last):
+    return db.session.scalars(
+        select(User.id).where(User.phone_number.between(first, last)).order_by(User.phone_number)
+    ).all()
+
+
+def insert_chunk(table, batch):
+    # Метки проверяются на пачку, как в app.importer: неизвестная - ошибка, а не новый код
+    for row in batch:
+        error = check_labels(table, row)
+        if error:
+            raise ValueError(f"{table.name}: {error['error']}, допустимо: {', '.join(error['allowed'])}")
+    db.session.execute(insert(table), batch)
+    db.session.commit()
+
+
+def chunked_insert(table, rows, chunk_size, label):
+    batch, total, started = [], 0, time.perf_counter()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            insert_chunk(table, batch)
+            total += len(batch)
+            batch = []
+            print(f"{label}: {total} ({total / (time.perf_counter() - started):.0f} rows/s)", flush=True)
+    if batch:
+        insert_chunk(table, batch)
+        total += len(batch)
+    print(f"{label}: {total} done", flush=True)
+    return total
+
+
+def generate(trainers, students, tasks_per_student, reports_per_student, days, seed, chunk_size):
+    rng = random.Random(seed)
+    password_hash = hash_password(PASSWORD)
+    # История - последние days дней: лента без date_from отдаёт окно от сегодняшнего дня
+    start = datetime.combine(date.today(), datetime.min.time()) - timedelta(days=days)
+
+    chunked_insert(User.__table__, (
+        {"phone_number": trainer_phone(i), "password_hash": password_hash, "is_active": True,
+         "is_trainer": True, "name": f"Trainer {i}", "nickname": f"trainer{i}"}
+        for i in range(1, trainers + 1)
+    ), chunk_size, "trainers")
+
+    trainer_ids = ids_by_phone(trainer_phone(1), trainer_phone(trainers))
+
+    def trainer_of(student):
+        return trainer_ids[(student - 1) % trainers]
+
+    chunked_insert(User.__table__, (
+        {"phone_number": student_phone(i), "password_hash": password_hash, "is_active": True,
+         "is_trainer": False, "trainer_id": trainer_of(i), "name": f"Student {i}",
+         "nickname": f"student{i}", "age": rng.randint(16, 60), "gender": rng.choice(GENDERS),
+         "weight": round(rng.uniform(50, 110), 1), "height": round(rng.uniform(150, 200), 1)}
+        for i in range(1, students + 1)
+    ), chunk_size, "students")
+
+    student_ids = ids_by_phone(student_phone(1), student_phone(students))
+
+    def moment():
+        return start + timedelta(seconds=rng.randrange(days * 86400))
+
+    chunked_insert(Task.__table__, (
+        {"trainer_id": trainer_of(i), "student_id": student_ids[i - 1],
+         "title": f"Workout {n}", "description": "Synthetic workout", "type": rng.choice(TYPES),
+         "duration": rng.randrange(15, 121, 5), "intensity": rng.choice(INTENSITIES), "date_time": moment()}
+        for i in range(1, students + 1) for n in range(tasks_per_student)
+    ), chunk_size, "tasks")
+
+    chunked_insert(SummaryReport.__table__, (
+        dict({"user_id": student_ids[i - 1], "difficaulty": rng.choice(DIFFICULTIES),
+              "self_health": "ok", "date": moment()},
+             **({"is_skip": True, "skip_reason": "sick"} if rng.random() < 0.1 else {"is_skip": False}))
+        for i in range(1, students + 1) for _ in range(reports_per_student)
+    ), chunk_size, "reports")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trainers', type=int, default=10)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--tasks-per-student', type=int, default=50)
+    parser.add_argument('--reports-per-student', type=int, default=20)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--create-schema', action='store_true', help='db.create_all() перед генерацией')
+    parser.add_argument('--rollups', action='store_true', help='пересчитать недельные агрегаты')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.create_schema:
+            db.create_all()
+        generate(args.trainers, args.students, args.tasks_per_student, args.reports_per_student,
+                 args.days, args.seed, args.chunk_size)
+        if args.rollups:
+            rebuild_rollups(args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Замер /tasks/task, /users/login и /users/profile/students на данных datagen.
+
+Режим client гоняет запросы через Flask test client в этом процессе и
+считает SQL-запросы на запрос; режим gunicorn запускает настоящий сервер
+(gunicorn.conf.py) и нагружает его параллельно по HTTP. Результат - JSON
+с коммитом, чтобы прогоны можно было сравнивать между коммитами.
+
+    python -m benchmarks.harness --mode client gunicorn --requests 500 --output bench.json
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from benchmarks.datagen import PASSWORD, student_phone, trainer_phone
+from benchmarks.load_test import percentile, request, wait_ready
+
+
+def scenarios(login):
+    """(имя, метод, путь, тело, токен) для каждого замеряемого эндпоинта"""
+    student_token = login(student_phone(1))
+    trainer_token = login(trainer_phone(1))
+    credentials = {"phone_number": student_phone(1), "password": PASSWORD}
+    return [
+        ("/users/login", "POST", "/users/login", credentials, None),
+        ("/tasks/task", "GET", "/tasks/task?limit=50", None, student_token),
+        ("/users/profile/students", "GET", "/users/profile/students?aggregates=1&limit=50", None, trainer_token),
+    ]
+
+
+def summarize(name, mode, latencies, elapsed, statuses, queries=None):
+    return {
+        "endpoint": name,
+        "mode": mode,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_client(args):
+    from app import create_app, db
+
+    app = create_app()
+    app.config['RATELIMIT_ENABLED'] = False
+    client = app.test_client()
+    counter = {"queries": 0}
+
+    def login(phone):
+        response = client.post('/users/login', json={"phone_number": phone, "password": PASSWORD})
+        return response.get_json()["access_token"]
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *_: counter.__setitem__("queries", counter["queries"] + 1))
+
+    results = []
+    for name, method, path, body, token in scenarios(login):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        latencies, statuses, queries = [], [], []
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            counter["queries"] = 0
+            begin = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            latencies.append(time.perf_counter() - begin)
+            statuses.append(response.status_code)
+            queries.append(counter["queries"])
+        results.append(summarize(name, "client", latencies, time.perf_counter() - started, statuses, queries))
+    return results
+
+
+def run_gunicorn(args):
+    env = dict(os.environ, GUNICORN_BIND=f"127.0.0.1:{args.port}", RATELIMIT_ENABLED='0')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'run:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(base_url)
+
+        def login(phone):
+            _, _, body = request(f"{base_url}/users/login", {"phone_number": phone, "password": PASSWORD})
+            return json.loads(body)["access_token"]
+
+        results = []
+        for name, method, path, body, token in scenarios(login):
+            call = lambda: request(f"{base_url}{path}", body if method == "POST" else None, token)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                samples = list(pool.map(lambda _: call(), range(args.requests)))
+            elapsed = time.perf_counter() - started
+            results.append(summarize(name, f"gunicorn/{os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')}",
+                                     [latency for latency, _, _ in samples], elapsed,
+                                     [status for _, status, _ in samples]))
+        return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', nargs='+', choices=['client', 'gunicorn'], default=['client'])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--output', help='файл для JSON-отчёта, по умолчанию stdout')
+    args = parser.parse_args()
+
+    results = []
+    if 'client' in args.mode:
+        results.extend(run_client(args))
+    if 'gunicorn' in args.mode:
+        results.extend(run_gunicorn(args))
+
+    report = json.dumps({"commit": git_commit(), "timestamp": time.time(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Пропускная способность подписи и проверки JWT по алгоритмам.
+
+    python -m benchmarks.jwt_algorithms
+"""
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+
+def pem_pair(private_key):
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return private_pem, public_pem
+
+
+def keys():
+    secret = secrets.token_bytes(32)
+    return {
+        "HS256": (secret, secret),
+        "EdDSA": pem_pair(ed25519.Ed25519PrivateKey.generate()),
+        "ES256": pem_pair(ec.generate_private_key(ec.SECP256R1())),
+        "RS256": pem_pair(rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+    }
+
+
+def ops_per_sec(fn, seconds):
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main(seconds=1.0):
+    now = datetime.now(timezone.utc)
+    claims = {"sub": "12345", "type": "access", "fresh": False, "jti": secrets.token_hex(16),
+              "iat": now, "nbf": now, "exp": now + timedelta(minutes=15)}
+
+    print(f"{'alg':<6} {'sign/s':>10} {'verify/s':>10} {'token bytes':>12}")
+    for algorithm, (private_key, public_key) in keys().items():
+        # Ключи в объекты один раз, как это делает PyJWT при переиспользовании
+        signer = jwt.get_algorithm_by_name(algorithm).prepare_key(private_key)
+        verifier = jwt.get_algorithm_by_name(algorithm).prepare_key(public_key)
+        token = jwt.encode(claims, signer, algorithm=algorithm)
+        sign = ops_per_sec(lambda: jwt.encode(claims, signer, algorithm=algorithm), seconds)
+        verify = ops_per_sec(lambda: jwt.decode(token, verifier, algorithms=[algorithm]), seconds)
+        print(f"{algorithm:<6} {sign:>10.0f} {verify:>10.0f} {len(token):>12}")
+
+
+if __name__ == "__main__":
+    main()
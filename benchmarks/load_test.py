@@ -0,0 +1,117 @@
+"""Нагрузочный тест /users/login и /tasks/task для разных режимов gunicorn.
+
+Для каждого режима запускает gunicorn с GUNICORN_WORKER_CLASS=<режим>,
+гоняет запросы с заданной параллельностью и печатает RPS и p50/p99.
+Нужна рабочая БД в DATABASE_URL со схемой (flask db upgrade).
+
+    python -m benchmarks.load_test --modes sync gthread gevent --requests 2000 --concurrency 64
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def request(url, payload=None, token=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method='POST' if data else 'GET')
+    req.add_header('Content-Type', 'application/json')
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            body, status = response.read(), response.status
+    except urllib.error.HTTPError as error:
+        body, status = error.read(), error.code
+    return time.perf_counter() - started, status, body
+
+
+def wait_ready(base_url, deadline=30):
+    until = time.monotonic() + deadline
+    while time.monotonic() < until:
+        try:
+            urllib.request.urlopen(f"{base_url}/swagger.json", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn не поднялся")
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run(base_url, name, call, total, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: call(), range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for latency, _, _ in results]
+    errors = sum(1 for _, status, _ in results if status >= 400)
+    return {
+        "endpoint": name,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+def bench_mode(mode, args):
+    # Без лимитов: иначе /users/login с одним телефоном после 5 запросов в минуту мерит 429
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=mode, GUNICORN_BIND=f"127.0.0.1:{args.port}",
+               RATELIMIT_ENABLED='0')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'run:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(base_url)
+        credentials = {"phone_number": args.phone, "password": args.password}
+        request(f"{base_url}/users/register", credentials)
+        _, _, body = request(f"{base_url}/users/login", credentials)
+        token = json.loads(body)["access_token"]
+
+        return [
+            dict(mode=mode, **run(base_url, "/users/login",
+                                  lambda: request(f"{base_url}/users/login", credentials),
+                                  args.requests, args.concurrency)),
+            dict(mode=mode, **run(base_url, "/tasks/task",
+                                  lambda: request(f"{base_url}/tasks/task?limit=50", token=token),
+                                  args.requests, args.concurrency)),
+        ]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--phone', default='79990000001')
+    parser.add_argument('--password', default='loadtest')
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        results.extend(bench_mode(mode, args))
+    print(f"{'mode':<8} {'endpoint':<14} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for row in results:
+        print(f"{row['mode']:<8} {row['endpoint']:<14} {row['rps']:>8} {row['p50_ms']:>8} {row['p99_ms']:>8} {row['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Микробенчмарк validate_phone: стоимость вызова без кэша и с кэшем.
+
+    python -m benchmarks.phone_validation
+"""
+import random
+import timeit
+
+from app.utils import _is_valid_digits, normalize_phone, validate_phone
+
+
+def baseline(phone_number):
+    """Прежняя реализация: нормализация + phonenumbers на каждый вызов"""
+    digits = normalize_phone(phone_number)
+    return _is_valid_digits.__wrapped__(digits), digits
+
+
+def main(number=20000, unique=500, seed=42):
+    rng = random.Random(seed)
+    canonical = [f"7916{rng.randrange(10 ** 7):07d}" for _ in range(unique)]
+    formatted = [f"8 (916) {p[4:7]}-{p[7:9]}-{p[9:]}" for p in canonical]
+
+    for label, sample in (("canonical", canonical), ("formatted", formatted)):
+        calls = [sample[i % unique] for i in range(number)]
+        _is_valid_digits.cache_clear()
+        before = timeit.timeit(lambda: [baseline(p) for p in calls], number=1)
+        after = timeit.timeit(lambda: [validate_phone(p) for p in calls], number=1)
+        print(f"{label:>10}: before {before / number * 1e6:7.2f} us/call, "
+              f"after {after / number * 1e6:7.2f} us/call, "
+              f"x{before / after:.1f}")
+    print(_is_valid_digits.cache_info())
+
+
+if __name__ == "__main__":
+    main()
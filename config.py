@@ -4,15 +4,150 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_uri):
+    """Параметры пула и движка SQLAlchemy из переменных окружения"""
+    if not database_uri or database_uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+    }
+
+    connect_args = {}
+    statement_timeout = os.environ.get('DB_STATEMENT_TIMEOUT_MS')
+    pgbouncer = env_bool('DB_PGBOUNCER')
+    if pgbouncer:
+        # PgBouncer в режиме transaction не поддерживает prepared statements
+        # и startup-параметр options; statement_timeout задаётся через SET LOCAL
+        # в начале транзакции (см. app.db_pool)
+        if database_uri.startswith('postgresql+psycopg:'):
+            connect_args['prepare_threshold'] = None
+    elif statement_timeout:
+        connect_args['options'] = f'-c statement_timeout={int(statement_timeout)}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def read_key(name):
+    """PEM-ключ из переменной окружения name или из файла по пути в name_FILE"""
+    path = os.environ.get(f'{name}_FILE')
+    if path:
+        with open(path) as key_file:
+            return key_file.read()
+    return os.environ.get(name)
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # flask_restx без этого сам превращает исключения flask_jwt_extended
+    # (нет токена, истёк, отозван, пользователь не найден) в 500, и до
+    # обработчиков JWTManager они не доходят
+    PROPAGATE_EXCEPTIONS = True
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    DB_PGBOUNCER = env_bool('DB_PGBOUNCER')
+    DB_STATEMENT_TIMEOUT_MS = os.environ.get('DB_STATEMENT_TIMEOUT_MS')
+    # Логировать использование overflow-соединений пула
+    DB_POOL_LOG_OVERFLOW = env_bool('DB_POOL_LOG_OVERFLOW', True)
+
+    # Журнал медленных SQL-запросов и порог предупреждения о N+1 (app.metrics)
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+    NPLUS1_THRESHOLD = int(os.environ.get('NPLUS1_THRESHOLD', 10))
+    # Каталог для снимков метрик воркеров: без него /metrics отдаёт данные
+    # одного воркера (метка pid), с ним - сумму по всем воркерам узла
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+    # Помесячные секции task / summary_report (app.partitions): сколько месяцев
+    # создавать вперёд, сколько хранить до архивации и куда выгружать архив
+    PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 3))
+    PARTITION_RETENTION_MONTHS = int(os.environ.get('PARTITION_RETENTION_MONTHS', 24))
+    PARTITION_ARCHIVE_DIR = os.environ.get('PARTITION_ARCHIVE_DIR', 'archive')
+    # /tasks/task и /tasks/profile/students/<nickname> без date_from и after
+    # отдают задачи от новых к старым окнами по N дней (prev_cursor - в более
+    # старое окно), чтобы страница читала только свои секции; 0 - без окон
+    TASK_FEED_WINDOW_DAYS = int(os.environ.get('TASK_FEED_WINDOW_DAYS', 90))
+
+    # Gunicorn (см. gunicorn.conf.py): sync, gthread или gevent.
+    # Для gthread pool_size пула БД должен быть не меньше числа потоков.
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+    GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+    GUNICORN_WORKER_CONNECTIONS = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+    GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+    # Интервал keepalive-комментариев в /tasks/stream, секунды
+    TASK_STREAM_HEARTBEAT = int(os.environ.get('TASK_STREAM_HEARTBEAT', 15))
+    # Открытых /tasks/stream на процесс при gthread/sync: каждый занимает поток
+    # из GUNICORN_THREADS. Под gevent не ограничивается; 0 - поток отключён
+    TASK_STREAM_THREADED_LIMIT = int(os.environ.get('TASK_STREAM_THREADED_LIMIT', 1))
 
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-super-secret-key'
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    # HS256 по умолчанию; EdDSA / ES256 - асимметричная подпись, граничным
+    # узлам для проверки токенов достаточно JWT_PUBLIC_KEY
+    JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+    JWT_PRIVATE_KEY = read_key('JWT_PRIVATE_KEY')
+    JWT_PUBLIC_KEY = read_key('JWT_PUBLIC_KEY')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15)))
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
-    JWT_HEADER_TYPE = 'Bearer'
\ No newline at end of file
+    JWT_HEADER_TYPE = 'Bearer'
+    # Синхронизация списка отозванных токенов из БД, секунды
+    REVOCATION_SYNC_INTERVAL = int(os.environ.get('REVOCATION_SYNC_INTERVAL', 10))
+    REVOCATION_REBUILD_INTERVAL = int(os.environ.get('REVOCATION_REBUILD_INTERVAL', 3600))
+    # Нахлёст инкрементального чтения по revoked_at: не меньше самой долгой
+    # транзакции, в которой отзывается токен
+    REVOCATION_SYNC_OVERLAP = int(os.environ.get('REVOCATION_SYNC_OVERLAP', 60))
+
+    # Политика хеширования паролей: scrypt (MEMORY_COST = N) или pbkdf2:sha256 (ITERATIONS).
+    # Хеши по старой политике пересчитываются при успешном входе.
+    PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'scrypt')
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))
+    PASSWORD_HASH_MEMORY_COST = int(os.environ.get('PASSWORD_HASH_MEMORY_COST', 32768))
+    # Пул процессов для хеширования в каждом воркере gunicorn; 0 - считать в
+    # потоке запроса. Пул заводится на процесс, поэтому на узле будет
+    # GUNICORN_WORKERS x PASSWORD_HASH_WORKERS процессов, а sync-воркер всё равно
+    # ждёт результата. Имеет смысл только с gthread/gevent и малым числом воркеров.
+    # flask import-athletes задаёт свой размер (--hash-workers).
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+
+    # Ограничение частоты запросов (app.ratelimit): "N/second|minute|hour|day".
+    # RATELIMIT_BACKEND: memory, redis или своё имя + RATELIMIT_BACKEND_FACTORY.
+    # memory - только для одного процесса: с несколькими воркерами лимит
+    # умножается на их число, в production нужен redis
+    RATELIMIT_ENABLED = env_bool('RATELIMIT_ENABLED', True)
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'memory')
+    RATELIMIT_REDIS_URL = os.environ.get('RATELIMIT_REDIS_URL')
+    RATELIMIT_LOGIN_PER_IP = os.environ.get('RATELIMIT_LOGIN_PER_IP', '30/minute')
+    RATELIMIT_LOGIN_PER_PHONE = os.environ.get('RATELIMIT_LOGIN_PER_PHONE', '5/minute')
+    RATELIMIT_REGISTER_PER_IP = os.environ.get('RATELIMIT_REGISTER_PER_IP', '10/minute')
+
+    # Число доверенных прокси перед приложением (nginx - 1): remote_addr для
+    # лимитов по IP берётся из X-Forwarded-For. 0 - приложение без прокси
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # Ограничения POST /users/import: импорт идёт внутри запроса и должен
+    # уложиться в GUNICORN_TIMEOUT; больше - командой flask import-athletes
+    IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', 1024 * 1024))
+    IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 5000))
+    IMPORT_MAX_USERS = int(os.environ.get('IMPORT_MAX_USERS', 100))
+
+    # Кэш пользователей для current_user
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
\ No newline at end of file
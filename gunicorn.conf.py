@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from config import Config
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = Config.GUNICORN_WORKER_CLASS
+workers = Config.GUNICORN_WORKERS
+threads = Config.GUNICORN_THREADS
+worker_connections = Config.GUNICORN_WORKER_CONNECTIONS
+timeout = Config.GUNICORN_TIMEOUT
+# flask partitions ensure при старте; дольше - воркеры стартуют без него
+PARTITIONS_TIMEOUT = 60
+
+
+def when_ready(server):
+    # Секции task / summary_report на ближайшие месяцы (app.partitions);
+    # без них новые строки уходят в default-секцию. Отдельным процессом:
+    # мастер не должен импортировать приложение - gevent-воркеры получили бы
+    # после fork threading.Lock модулей, созданные до monkey.patch_all()
+    try:
+        result = subprocess.run(
+            [sys.executable, '-m', 'flask', '--app', 'run', 'partitions', 'ensure'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=PARTITIONS_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        server.log.exception("Partition maintenance failed")
+        return
+    if result.returncode:
+        server.log.error("Partition maintenance failed: %s", result.stderr.strip())
+    else:
+        server.log.info("Partition maintenance: %s", " ".join(result.stdout.split()))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # monkey.patch_all() gevent-воркер выполнит позже, в init_process;
+        # psycopg2 - C-расширение, и patch_all его не касается, поэтому его
+        # ожидание сокета делаем кооперативным отдельно (порядок не важен)
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        server.log.info("psycopg2 patched for gevent in worker %s", worker.pid)
@@ -0,0 +1,26 @@
+"""user trainer_id nickname index
+
+Revision ID: 194bddfde251
+Revises: 80576de4ee95
+Create Date: 2026-10-18 11:03:27.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '194bddfde251'
+down_revision = '80576de4ee95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_trainer_id_nickname', ['trainer_id', 'nickname'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_trainer_id_nickname')
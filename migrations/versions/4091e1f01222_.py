@@ -0,0 +1,43 @@
+"""weekly stats rollups
+
+Revision ID: 4091e1f01222
+Revises: 9de630b5d825
+Create Date: 2026-10-18 13:02:44.693180
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4091e1f01222'
+down_revision = '9de630b5d825'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('weekly_stats',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('week', sa.Date(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.Column('total_duration', sa.Integer(), nullable=False),
+    sa.Column('report_count', sa.Integer(), nullable=False),
+    sa.Column('skip_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'week')
+    )
+    op.create_table('weekly_stats_breakdown',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('week', sa.Date(), nullable=False),
+    sa.Column('dimension', sa.String(length=32), nullable=False),
+    sa.Column('value', sa.String(length=128), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'week', 'dimension', 'value')
+    )
+
+
+def downgrade():
+    op.drop_table('weekly_stats_breakdown')
+    op.drop_table('weekly_stats')
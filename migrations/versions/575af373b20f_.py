@@ -0,0 +1,26 @@
+"""user data_version
+
+Revision ID: 575af373b20f
+Revises: 4091e1f01222
+Create Date: 2026-10-18 14:41:09.336518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '575af373b20f'
+down_revision = '4091e1f01222'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
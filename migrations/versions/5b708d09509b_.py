@@ -0,0 +1,31 @@
+"""revoked_token
+
+Revision ID: 5b708d09509b
+Revises: 575af373b20f
+Create Date: 2026-10-18 15:26:52.004417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b708d09509b'
+down_revision = '575af373b20f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revoked_token',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('jti', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('jti')
+    )
+
+
+def downgrade():
+    op.drop_table('revoked_token')
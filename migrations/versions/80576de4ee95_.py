@@ -0,0 +1,28 @@
+"""task feed indexes
+
+Revision ID: 80576de4ee95
+Revises: 0aacdcaee862
+Create Date: 2026-10-18 10:12:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '80576de4ee95'
+down_revision = '0aacdcaee862'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_student_id_date_time_id', ['student_id', 'date_time', 'id'], unique=False)
+        batch_op.create_index('ix_task_trainer_id_date_time_id', ['trainer_id', 'date_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_trainer_id_date_time_id')
+        batch_op.drop_index('ix_task_student_id_date_time_id')
@@ -0,0 +1,26 @@
+"""summary_report user_id date index
+
+Revision ID: 9de630b5d825
+Revises: 194bddfde251
+Create Date: 2026-10-18 12:20:05.871236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9de630b5d825'
+down_revision = '194bddfde251'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('summary_report', schema=None) as batch_op:
+        batch_op.create_index('ix_summary_report_user_id_date', ['user_id', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('summary_report', schema=None) as batch_op:
+        batch_op.drop_index('ix_summary_report_user_id_date')
@@ -0,0 +1,26 @@
+"""user version
+
+Revision ID: ce80be6f7551
+Revises: 5b708d09509b
+Create Date: 2026-10-18 18:05:42.117304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ce80be6f7551'
+down_revision = '5b708d09509b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('version')
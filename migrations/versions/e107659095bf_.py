@@ -0,0 +1,122 @@
+"""label codes for task type/intensity, user gender and report fields
+
+Revision ID: e107659095bf
+Revises: ce80be6f7551
+Create Date: 2026-10-18 19:12:37.508126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e107659095bf'
+down_revision = 'ce80be6f7551'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+# (таблица, колонка, dimension в label, длина строки, NOT NULL)
+COLUMNS = (
+    ('task', 'type', 'task_type', 128, False),
+    ('task', 'intensity', 'task_intensity', 64, False),
+    ('user', 'gender', 'user_gender', 16, False),
+    ('summary_report', 'difficaulty', 'report_difficaulty', 128, True),
+    ('summary_report', 'self_health', 'report_self_health', 128, False),
+)
+
+# Закрытый словарь на момент миграции (app.labels.DEFAULT_LABELS); прочие
+# значения из данных получают коды после словарных
+VOCABULARY = {
+    'task_type': ('run', 'swim', 'bike', 'strength', 'stretching', 'yoga'),
+    'task_intensity': ('low', 'medium', 'high'),
+    'user_gender': ('male', 'female'),
+    'report_difficaulty': ('easy', 'normal', 'hard', 'very hard'),
+    'report_self_health': ('bad', 'ok', 'good'),
+}
+SMALLINT_MAX = 32767
+# summary_report.self_health имел server_default=now() (7d9c9e187240): в
+# отчётах без оценки лежит время создания, это не метка
+TIMESTAMP_PATTERNS = ('____-__-__ __:__:__%', '____-__-__T__:__:__%')
+
+label = sa.table('label', sa.column('dimension'), sa.column('code'), sa.column('label'))
+
+
+def _in_batches(connection, table, statement):
+    """statement для диапазонов id по BATCH_SIZE строк"""
+    low, high = connection.execute(sa.select(sa.func.min(table.c.id), sa.func.max(table.c.id))).one()
+    if low is None:
+        return
+    for start in range(low - 1, high, BATCH_SIZE):
+        connection.execute(statement.where(table.c.id > start, table.c.id <= start + BATCH_SIZE))
+
+
+def upgrade():
+    op.create_table('label',
+    sa.Column('dimension', sa.String(length=32), nullable=False),
+    sa.Column('code', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('label', sa.String(length=128), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'code'),
+    sa.UniqueConstraint('dimension', 'label', name='uq_label_dimension_label')
+    )
+    connection = op.get_bind()
+
+    report = sa.table('summary_report', sa.column('id'), sa.column('self_health'))
+    _in_batches(connection, report, sa.update(report).values(self_health=None).where(
+        sa.or_(*(report.c.self_health.like(pattern) for pattern in TIMESTAMP_PATTERNS))
+    ))
+
+    for table_name, column, dimension, _, _ in COLUMNS:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(f'{column}_code', sa.SmallInteger(), nullable=True))
+
+        table = sa.table(table_name, sa.column('id'), sa.column(column), sa.column(f'{column}_code'))
+        vocabulary = VOCABULARY[dimension]
+        values = connection.scalars(
+            sa.select(table.c[column]).where(table.c[column].isnot(None)).distinct()
+        ).all()
+        extra = sorted(set(values) - set(vocabulary))
+        if len(vocabulary) + len(extra) > SMALLINT_MAX:
+            raise RuntimeError(
+                f"{table_name}.{column}: {len(extra)} значений вне словаря, коды не помещаются в smallint"
+            )
+        op.bulk_insert(label, [
+            {"dimension": dimension, "code": code, "label": value}
+            for code, value in enumerate(list(vocabulary) + extra, 1)
+        ])
+        code = (
+            sa.select(label.c.code)
+            .where(label.c.dimension == dimension, label.c.label == table.c[column])
+            .scalar_subquery()
+        )
+        _in_batches(connection, table, sa.update(table).values({f'{column}_code': code}))
+
+    for table_name, column, _, _, not_null in COLUMNS:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column(column)
+            batch_op.alter_column(f'{column}_code', new_column_name=column,
+                                  existing_type=sa.SmallInteger(), nullable=not not_null)
+
+
+def downgrade():
+    connection = op.get_bind()
+
+    for table_name, column, dimension, length, not_null in COLUMNS:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(f'{column}_text', sa.String(length=length), nullable=True))
+
+        table = sa.table(table_name, sa.column('id'), sa.column(column), sa.column(f'{column}_text'))
+        text = (
+            sa.select(label.c.label)
+            .where(label.c.dimension == dimension, label.c.code == table.c[column])
+            .scalar_subquery()
+        )
+        _in_batches(connection, table, sa.update(table).values({f'{column}_text': text}))
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column(column)
+            batch_op.alter_column(f'{column}_text', new_column_name=column,
+                                  existing_type=sa.String(length=length), nullable=not not_null)
+
+    op.drop_table('label')
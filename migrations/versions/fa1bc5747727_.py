@@ -0,0 +1,116 @@
+"""monthly range partitions for task and summary_report
+
+Revision ID: fa1bc5747727
+Revises: e107659095bf
+Create Date: 2026-10-18 20:31:05.662418
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fa1bc5747727'
+down_revision = 'e107659095bf'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+MONTHS_AHEAD = 3
+
+# (таблица, ключ секционирования, индексы, внешние ключи)
+TABLES = (
+    ('task', 'date_time',
+     (('ix_task_student_id_date_time_id', ['student_id', 'date_time', 'id']),
+      ('ix_task_trainer_id_date_time_id', ['trainer_id', 'date_time', 'id'])),
+     (('task_trainer_id_fkey', 'trainer_id'), ('task_student_id_fkey', 'student_id'))),
+    ('summary_report', 'date',
+     (('ix_summary_report_user_id_date', ['user_id', 'date']),),
+     (('summary_report_user_id_fkey', 'user_id'),)),
+)
+
+
+def _add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def _copy(connection, source, target):
+    """INSERT ... SELECT диапазонами id по BATCH_SIZE строк"""
+    low, high = connection.execute(sa.text(f"SELECT min(id), max(id) FROM {source}")).one()
+    if low is None:
+        return
+    for start in range(low - 1, high, BATCH_SIZE):
+        connection.execute(
+            sa.text(f"INSERT INTO {target} SELECT * FROM {source} WHERE id > :low AND id <= :high"),
+            {"low": start, "high": start + BATCH_SIZE},
+        )
+
+
+def _own_sequence(connection, source, target):
+    sequence = connection.scalar(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": source})
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {target}.id")
+
+
+def _create_indexes(table, indexes, foreign_keys):
+    for name, columns in indexes:
+        op.create_index(name, table, columns, unique=False)
+    for name, column in foreign_keys:
+        op.create_foreign_key(name, table, 'user', [column], ['id'])
+
+
+def upgrade():
+    # SQLite (разработка и тесты) секций не поддерживает - схема остаётся прежней
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    connection = op.get_bind()
+
+    for table, column, indexes, foreign_keys in TABLES:
+        old = f'{table}_unpartitioned'
+        op.execute(f"UPDATE {table} SET {column} = now() WHERE {column} IS NULL")
+        op.rename_table(table, old)
+        op.execute(f"ALTER INDEX {table}_pkey RENAME TO {old}_pkey")
+        for name, _ in indexes:
+            op.drop_index(name, table_name=old)
+
+        # Первичный ключ секционированной таблицы обязан включать ключ секционирования
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+        op.create_primary_key(f'{table}_pkey', table, ['id', column])
+        _create_indexes(table, indexes, foreign_keys)
+        _own_sequence(connection, old, table)
+
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        first = connection.scalar(sa.text(f"SELECT date_trunc('month', min({column}))::date FROM {old}"))
+        current = date.today().replace(day=1)
+        month = min(first or current, current)
+        while month <= _add_months(current, MONTHS_AHEAD):
+            op.execute(
+                f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+            )
+            month = _add_months(month, 1)
+
+        _copy(connection, old, table)
+        op.drop_table(old)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    connection = op.get_bind()
+
+    for table, column, indexes, foreign_keys in TABLES:
+        plain = f'{table}_plain'
+        op.execute(f"CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)")
+        op.execute(f"ALTER TABLE {plain} ALTER COLUMN {column} DROP NOT NULL")
+        _copy(connection, table, plain)
+        _own_sequence(connection, table, plain)
+        # Вместе с родителем удаляются секции и их индексы
+        op.drop_table(table)
+        op.rename_table(plain, table)
+        op.create_primary_key(f'{table}_pkey', table, ['id'])
+        _create_indexes(table, indexes, foreign_keys)
@@ -1,12 +1,103 @@
+import os
+from datetime import date
+
+import click
 from app import create_app, db
 from app.models import User
+from app.importer import Importer, read_records
+from app.labels import DEFAULT_LABELS, add_labels, label_cache
+from app.partitions import add_months, archive_partitions, ensure_partitions, month_start
+from app.stats import rebuild_rollups
+from app.user_loader import user_cache
 
 
 app = create_app()
 
 @app.shell_context_processor
 def make_shell_context():
-    return {'db': db, 'User': User}
+    return {'db': db, 'User': User, 'user_cache': user_cache}
+
+@app.cli.command('rebuild-stats')
+@click.option('--batch-size', default=5000, show_default=True, help='Строк задач / отчётов за один запрос')
+@click.option('--students', default=200, show_default=True,
+              help='Учеников на транзакцию: их вставки ждут пересчёта диапазона')
+def rebuild_stats(batch_size, students):
+    """Пересчёт недельных агрегатов по всей истории задач и отчётов"""
+    rebuild_rollups(batch_size, students, log=click.echo)
+
+@app.cli.command('import-athletes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='По умолчанию определяется по расширению файла')
+@click.option('--chunk-size', default=1000, show_default=True)
+@click.option('--hash-workers', default=os.cpu_count() or 1, show_default=True,
+              help='Процессов для хеширования паролей')
+def import_athletes(path, fmt, chunk_size, hash_workers):
+    """Импорт спортсменов, задач и отчётов из CSV / NDJSON"""
+    app.config['PASSWORD_HASH_WORKERS'] = hash_workers
+    fmt = fmt or ('csv' if path.endswith('.csv') else 'ndjson')
+
+    def progress(processed, created, errors):
+        click.echo(f"{processed} строк, создано {created}, ошибок {errors}")
+
+    with open(path, encoding='utf-8', newline='') as source:
+        result = Importer(chunk_size=chunk_size, progress=progress).run(read_records(source, fmt))
+    for error in result['errors']:
+        click.echo(f"строка {error['line']}: {error['error']}", err=True)
+
+@app.cli.group()
+def labels():
+    """Закрытые словари меток (тип задачи, интенсивность, пол, оценки)"""
+
+@labels.command('list')
+def labels_list():
+    """Допустимые метки по словарям"""
+    label_cache.reload()
+    for dimension in DEFAULT_LABELS:
+        click.echo(f"{dimension}: {', '.join(label_cache.allowed(dimension))}")
+
+@labels.command('add')
+@click.argument('dimension', type=click.Choice(list(DEFAULT_LABELS)))
+@click.argument('values', nargs=-1, required=True)
+def labels_add(dimension, values):
+    """Добавление меток в словарь; другие процессы подхватят их при первом промахе кэша"""
+    try:
+        added = add_labels(dimension, values)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    click.echo(f"добавлено: {', '.join(added) or 'ничего'}")
+
+@app.cli.group()
+def partitions():
+    """Помесячные секции task и summary_report (PostgreSQL)"""
+
+@partitions.command('ensure')
+@click.option('--months-ahead', type=int, default=None, help='По умолчанию PARTITION_MONTHS_AHEAD')
+def partitions_ensure(months_ahead):
+    """Создание секций на ближайшие месяцы; запускать из cron"""
+    if months_ahead is None:
+        months_ahead = app.config['PARTITION_MONTHS_AHEAD']
+    with db.engine.connect() as connection:
+        created = ensure_partitions(connection, months_ahead)
+    click.echo(f"создано секций: {len(created)}")
+    for name in created:
+        click.echo(name)
+
+@partitions.command('archive')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m']), default=None,
+              help='Первый месяц, который остаётся в БД; по умолчанию PARTITION_RETENTION_MONTHS назад')
+@click.option('--dir', 'directory', default=None, help='По умолчанию PARTITION_ARCHIVE_DIR')
+@click.option('--keep-tables', is_flag=True, help='Не удалять отсоединённые секции после выгрузки')
+def partitions_archive(before, directory, keep_tables):
+    """Отсоединение старых секций и выгрузка в <секция>.csv.gz"""
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException("Секционирование поддерживается только в PostgreSQL")
+    if before is None:
+        before = add_months(month_start(date.today()), -app.config['PARTITION_RETENTION_MONTHS'])
+    directory = directory or app.config['PARTITION_ARCHIVE_DIR']
+    with db.engine.connect() as connection:
+        archived = archive_partitions(connection, before, directory, keep=keep_tables, log=click.echo)
+    click.echo(f"в архиве секций: {len(archived)}")
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
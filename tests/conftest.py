@@ -0,0 +1,39 @@
+import pytest
+
+from app import create_app, db
+from app.models import User
+from config import Config
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    TESTING = True
+    RATELIMIT_ENABLED = False
+    JWT_SECRET_KEY = 'test-secret-key-' * 3
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Регистрация и вход; возвращает (id, заголовки с access-токеном)"""
+    def register(phone, is_trainer=False, password='secret1'):
+        client.post('/users/register', json={'phone_number': phone, 'password': password, 'is_trainer': is_trainer})
+        response = client.post('/users/login', json={'phone_number': phone, 'password': password})
+        user_id = db.session.scalar(db.select(User.id).where(User.phone_number == phone))
+        return user_id, {'Authorization': f"Bearer {response.json['access_token']}"}
+    return register
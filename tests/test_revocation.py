@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from app import db
+from app.models import RevokedToken
+from app.revocation import RevocationList, db_now, utcnow
+
+
+def test_incremental_sync_after_empty_start(app):
+    revocations = RevocationList()
+    revocations.sync(force=True)
+    assert revocations.watermark is not None and revocations.watermark.tzinfo is None
+    assert db_now().tzinfo is None
+
+    # Отзыв в другом воркере: строка появляется только в БД
+    db.session.add(RevokedToken(jti='other-worker', expires_at=utcnow() + timedelta(hours=1)))
+    db.session.commit()
+    revocations._next_sync = 0
+    assert revocations.is_revoked('other-worker')
+    assert revocations.watermark.tzinfo is None
@@ -0,0 +1,34 @@
+from sqlalchemy import delete, select
+
+from app import db
+from app.models import WeeklyStats, WeeklyStatsBreakdown
+from app.stats import rebuild_rollups
+
+
+def snapshot():
+    return (
+        sorted(db.session.execute(select(WeeklyStats.__table__)).all()),
+        sorted(db.session.execute(select(WeeklyStatsBreakdown.__table__)).all()),
+    )
+
+
+def test_rebuild_by_student_ranges_matches_live_rollups(client, register):
+    _, trainer = register('79160000001', is_trainer=True)
+    students = [register(f'7916000001{i}') for i in range(5)]
+    for index, (student_id, headers) in enumerate(students):
+        for day in range(1, 4 + index):
+            client.post('/tasks/task', headers=trainer, json={
+                'student_id': student_id, 'title': 't', 'description': 'd', 'type': 'swim',
+                'duration': 10 * day, 'intensity': 'high', 'date_time': f'2025-03-{day:02d}T10:00:00',
+            })
+        client.post('/summary/report', headers=headers,
+                    json={'difficaulty': 'easy', 'is_skip': True, 'skip_reason': 'болезнь', 'date': '2025-03-02'})
+    live = snapshot()
+    assert live[0]
+
+    db.session.execute(delete(WeeklyStatsBreakdown))
+    db.session.execute(WeeklyStats.__table__.update().values(task_count=999))
+    db.session.commit()
+
+    rebuild_rollups(batch_size=2, students=2, log=lambda message: None)
+    assert snapshot() == live
@@ -0,0 +1,33 @@
+from app import db
+from app.models import User
+
+
+def task(student_id, **fields):
+    return dict({'student_id': student_id, 'title': 'Бег', 'description': '5 км', 'type': 'run',
+                 'duration': 30, 'intensity': 'low', 'date_time': '2025-03-03T10:00:00'}, **fields)
+
+
+def test_single_task_does_not_take_over_another_trainers_student(client, register):
+    trainer_id, trainer = register('79160000001', is_trainer=True)
+    _, intruder = register('79160000002', is_trainer=True)
+    student_id, student = register('79160000003')
+
+    assert client.post('/tasks/task', headers=trainer, json=task(student_id)).status_code == 201
+    client.post('/summary/report', headers=student, json={'difficaulty': 'hard', 'comment': 'болит колено'})
+
+    response = client.post('/tasks/task', headers=intruder, json=task(student_id))
+    assert response.status_code == 403
+    assert db.session.get(User, student_id).trainer_id == trainer_id
+    assert client.get(f'/tasks/export/{student_id}', headers=intruder).status_code == 404
+    assert client.get(f'/tasks/export/{student_id}', headers=trainer).status_code == 200
+
+
+def test_single_task_requires_trainer_and_student(client, register):
+    trainer_id, trainer = register('79160000001', is_trainer=True)
+    other_trainer_id, _ = register('79160000002', is_trainer=True)
+    student_id, student = register('79160000003')
+
+    assert client.post('/tasks/task', headers=student, json=task(student_id)).status_code == 403
+    assert client.post('/tasks/task', headers=trainer, json=task(other_trainer_id)).status_code == 404
+    assert client.post('/tasks/task', headers=trainer, json=task(9999)).status_code == 404
+    assert db.session.get(User, other_trainer_id).trainer_id is None
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Task, User
+
+AGES = (400, 40, 10, 1)
+
+
+@pytest.fixture
+def history(app, register):
+    app.config['TASK_FEED_WINDOW_DAYS'] = 30
+    trainer_id, trainer = register('79160000001', is_trainer=True)
+    student_id, student = register('79160000003')
+    student_row = db.session.get(User, student_id)
+    student_row.trainer_id, student_row.nickname = trainer_id, 'bob'
+    now = datetime.now()
+    for age in AGES:
+        db.session.add(Task(trainer_id=trainer_id, student_id=student_id, title=str(age), description='d',
+                            date_time=now - timedelta(days=age), type='run', duration=1, intensity='low'))
+    db.session.commit()
+    return trainer, student
+
+
+def walk(client, url, headers, limit):
+    """Все страницы по prev_cursor: заголовки задач и число запросов"""
+    titles, pages, cursor = [], 0, None
+    while True:
+        response = client.get(f"{url}?limit={limit}" + (f"&before={cursor}" if cursor else ''), headers=headers)
+        assert response.status_code == 200
+        assert response.json['next_cursor'] is None
+        titles += [task['title'] for task in response.json['tasks']]
+        pages += 1
+        cursor = response.json['prev_cursor']
+        if cursor is None:
+            return titles, pages
+
+
+@pytest.mark.parametrize('limit', [1, 2, 10])
+def test_feed_pages_newest_first_through_all_windows(client, history, limit):
+    _, student = history
+    titles, pages = walk(client, '/tasks/task', student, limit)
+    assert titles == [str(age) for age in sorted(AGES)]
+    assert pages <= len(AGES) * 2
+
+
+def test_first_page_is_the_recent_window(client, history):
+    _, student = history
+    response = client.get('/tasks/task', headers=student)
+    assert [task['title'] for task in response.json['tasks']] == ['1', '10']
+    assert response.json['prev_cursor'] is not None
+
+
+@pytest.mark.parametrize('limit', [1, 3])
+def test_student_tasks_page_newest_first_through_all_windows(client, history, limit):
+    trainer, _ = history
+    titles, _ = walk(client, '/tasks/profile/students/bob', trainer, limit)
+    assert titles == [str(age) for age in sorted(AGES)]
+
+
+def test_date_from_keeps_ascending_feed(client, history):
+    _, student = history
+    response = client.get('/tasks/task?limit=3&date_from=2000-01-01', headers=student)
+    assert [task['title'] for task in response.json['tasks']] == ['400', '40', '10']
+    response = client.get(f"/tasks/task?after={response.json['next_cursor']}", headers=student)
+    assert [task['title'] for task in response.json['tasks']] == ['1']
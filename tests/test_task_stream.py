@@ -0,0 +1,18 @@
+from app.events import broker
+
+
+def test_logout_with_refresh_token_closes_stream(app, client, register):
+    app.config['TASK_STREAM_HEARTBEAT'] = 1
+    register('79160000003')
+    tokens = client.post('/users/login', json={'phone_number': '79160000003', 'password': 'secret1'}).json
+
+    response = client.get('/tasks/stream', headers={'Authorization': f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 200
+    events = iter(response.response)
+    assert next(events).startswith(b'retry:')
+
+    assert client.post('/users/logout', headers={'Authorization': f"Bearer {tokens['refresh_token']}"}).status_code == 200
+    assert next(events).startswith(b'event: expired')
+    assert next(events, None) is None
+    response.close()
+    assert not any(broker._subscribers.values())